@@ -11,8 +11,8 @@ from argparse import Namespace
 from collections import Counter, deque
 from collections.abc import Collection, MutableSequence
 from enum import IntEnum, IntFlag
-from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, TypedDict, Union, \
-    Type, ClassVar
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple, \
+    TypedDict, Union, Type, ClassVar
 
 import NetUtils
 import Options
@@ -84,6 +84,8 @@ class MultiWorld():
     random: random.Random
     per_slot_randoms: Dict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
+    profiler: Optional[Utils.GenerationProfiler] = None
+    """Set by Generate.py --profile to record timings of generation steps."""
 
     class AttributeProxy():
         def __init__(self, rule):
@@ -505,16 +507,14 @@ class MultiWorld():
             if self.has_beaten_game(self.state):
                 return True
             state = CollectionState(self)
-        prog_locations = {location for location in self.get_locations() if location.item
-                          and location.item.advancement and location not in state.locations_checked}
+        prog_locations = SphereFrontier(state, (location for location in self.get_locations() if location.item
+                                                and location.item.advancement
+                                                and location not in state.locations_checked))
 
-        while prog_locations:
-            sphere: Set[Location] = set()
+        while prog_locations.remaining:
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-            for location in prog_locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+            sphere = prog_locations.next_sphere()
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
@@ -522,7 +522,6 @@ class MultiWorld():
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            prog_locations -= sphere
 
             if self.has_beaten_game(state):
                 return True
@@ -538,23 +537,18 @@ class MultiWorld():
         unreachable locations.
         """
         state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        locations = SphereFrontier(state, self.get_filled_locations())
 
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+        while locations.remaining:
+            sphere = locations.next_sphere()
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                if locations.remaining:
+                    yield locations.remaining  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
@@ -588,22 +582,20 @@ class MultiWorld():
             """Check if all access rules are fulfilled"""
             if not beatable_fulfilled:
                 return False
-            if any(location_condition(location) for location in locations):
+            if any(location_condition(location) for location in locations.remaining):
                 return False  # still locations required to be collected
             return True
 
-        locations = [location for location in self.get_locations() if location_relevant(location)]
+        locations = SphereFrontier(state, (location for location in self.get_locations()
+                                           if location_relevant(location)))
 
-        while locations:
-            sphere: List[Location] = []
-            for n in range(len(locations) - 1, -1, -1):
-                if locations[n].can_reach(state):
-                    sphere.append(locations.pop(n))
+        while locations.remaining:
+            sphere = locations.next_sphere()
 
             if not sphere:
                 # ran out of places and did not finish yet, quit
                 logging.warning(f"Could not access required locations for accessibility check."
-                                f" Missing: {locations}")
+                                f" Missing: {sorted(locations.remaining)}")
                 return False
 
             for location in sphere:
@@ -627,6 +619,7 @@ class CollectionState():
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
     blocked_connections: Dict[int, Set[Entrance]]
+    shared_reachability: Set[int]
     events: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
@@ -639,6 +632,7 @@ class CollectionState():
         self.multiworld = parent
         self.reachable_regions = {player: set() for player in parent.get_all_ids()}
         self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.shared_reachability = set()
         self.events = set()
         self.path = {}
         self.locations_checked = set()
@@ -650,6 +644,7 @@ class CollectionState():
                 self.collect(item, True)
 
     def update_reachable_regions(self, player: int):
+        self._unshare_reachability(player)
         self.stale[player] = False
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
@@ -682,19 +677,33 @@ class CollectionState():
                         queue.append(new_entrance)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = copy.deepcopy(self.prog_items)
-        ret.reachable_regions = {player: copy.copy(self.reachable_regions[player]) for player in
-                                 self.reachable_regions}
-        ret.blocked_connections = {player: copy.copy(self.blocked_connections[player]) for player in
-                                   self.blocked_connections}
+        """
+        Creates a copy of this state. Region reachability is shared between both states per player, until either of
+        them has to update it for that player.
+        """
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        ret.prog_items = {player: items.copy() for player, items in self.prog_items.items()}
+        ret.reachable_regions = self.reachable_regions.copy()
+        ret.blocked_connections = self.blocked_connections.copy()
+        ret.shared_reachability = set(self.reachable_regions)
+        self.shared_reachability = set(self.reachable_regions)
         ret.events = copy.copy(self.events)
         ret.path = copy.copy(self.path)
         ret.locations_checked = copy.copy(self.locations_checked)
+        ret.stale = {player: True for player in self.multiworld.get_all_ids()}
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
 
+    def _unshare_reachability(self, player: int) -> None:
+        if player in self.shared_reachability:
+            self.shared_reachability.remove(player)
+            self.reachable_regions[player] = self.reachable_regions[player].copy()
+            self.blocked_connections[player] = self.blocked_connections[player].copy()
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -716,11 +725,11 @@ class CollectionState():
             locations = self.multiworld.get_filled_locations()
         reachable_events = True
         # since the loop has a good chance to run more than once, only filter the events once
-        locations = {location for location in locations if location.event and location not in self.events and
-                     not key_only or getattr(location.item, "locked_dungeon_item", False)}
+        locations = SphereFrontier(self, (location for location in locations
+                                          if location.event and location not in self.events and not key_only
+                                          or getattr(location.item, "locked_dungeon_item", False)))
         while reachable_events:
-            reachable_events = {location for location in locations if location.can_reach(self)}
-            locations -= reachable_events
+            reachable_events = locations.next_sphere()
             for event in reachable_events:
                 self.events.add(event)
                 assert isinstance(event.item, Item), "tried to collect Event with no Item"
@@ -784,11 +793,167 @@ class CollectionState():
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
             # invalidate caches, nothing can be trusted anymore now
+            self.shared_reachability.discard(item.player)
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
             self.stale[item.player] = True
 
 
+class _ItemReadRecorder(CollectionState):
+    """
+    While SphereFrontier runs an access_rule, the CollectionState's class is swapped for a subclass of this.
+    Item queries are noted by name. Reading any other attribute of the state, or another player's items, makes the
+    rule's dependencies unknown, so it gets retried on every sphere. Reading the multiworld is not noted, as item
+    placements don't change while a SphereFrontier is searched.
+    """
+    _recorder_types: ClassVar[Dict[Tuple[str, ...], Type[_ItemReadRecorder]]] = {}
+    _untracked_attributes: ClassVar[FrozenSet[str]] = frozenset(("multiworld", "path", "_item_reads", "_reads_player"))
+    _item_reads: Optional[Set[str]]
+    _reads_player: int
+
+    @classmethod
+    def record(cls, state: CollectionState, player: int) -> Tuple[type, Optional[Set[str]], Optional[int]]:
+        attributes = tuple(state.__dict__)
+        recorder = cls._recorder_types.get(attributes, None)
+        if recorder is None:
+            recorder = type(cls.__name__, (cls,), {name: cls._untracked_attribute(name) for name in attributes
+                                                   if name not in cls._untracked_attributes})
+            cls._recorder_types[attributes] = recorder
+        saved = state.__class__, state.__dict__.get("_item_reads", None), state.__dict__.get("_reads_player", None)
+        state._item_reads = set()
+        state._reads_player = player
+        state.__class__ = recorder
+        return saved
+
+    @staticmethod
+    def restore(state: CollectionState, saved: Tuple[type, Optional[Set[str]], Optional[int]]) -> Optional[Set[str]]:
+        """Undoes record and returns the item names read, None if unknown."""
+        reads = state._item_reads
+        state.__class__, state._item_reads, state._reads_player = saved
+        # a rule that fails without looking at any item depends on something else, such as an unconnected Entrance
+        return reads if reads else None
+
+    @staticmethod
+    def _untracked_attribute(name: str) -> property:
+        def getter(self: _ItemReadRecorder) -> Any:
+            self._item_reads = None
+            return self.__dict__[name]
+
+        def setter(self: _ItemReadRecorder, value: Any) -> None:
+            self._item_reads = None
+            self.__dict__[name] = value
+
+        def deleter(self: _ItemReadRecorder) -> None:
+            self._item_reads = None
+            del self.__dict__[name]
+
+        return property(getter, setter, deleter)
+
+    def _note(self, items: Iterable[str], player: int) -> None:
+        if self._item_reads is not None:
+            if player == self._reads_player:
+                self._item_reads.update(items)
+            else:
+                self._item_reads = None
+
+    def has(self, item: str, player: int, count: int = 1) -> bool:
+        self._note((item,), player)
+        return self.__dict__["prog_items"][player][item] >= count
+
+    def has_all(self, items: Iterable[str], player: int) -> bool:
+        items = tuple(items)
+        self._note(items, player)
+        return all(self.__dict__["prog_items"][player][item] for item in items)
+
+    def has_any(self, items: Iterable[str], player: int) -> bool:
+        items = tuple(items)
+        self._note(items, player)
+        return any(self.__dict__["prog_items"][player][item] for item in items)
+
+    def count(self, item: str, player: int) -> int:
+        self._note((item,), player)
+        return self.__dict__["prog_items"][player][item]
+
+    def has_group(self, item_name_group: str, player: int, count: int = 1) -> bool:
+        return self.count_group(item_name_group, player) >= count
+
+    def count_group(self, item_name_group: str, player: int) -> int:
+        item_names = self.multiworld.worlds[player].item_name_groups[item_name_group]
+        self._note(item_names, player)
+        player_prog_items = self.__dict__["prog_items"][player]
+        return sum(player_prog_items[item_name] for item_name in item_names)
+
+
+class SphereFrontier:
+    """
+    Finds the locations of a collection that become reachable sphere by sphere, the same as rescanning all remaining
+    locations with can_reach whenever the state changed. A location that failed is only tried again once its parent
+    region is reachable, once an item count its access_rule looked at changed, or every time if its access_rule
+    depends on anything else.
+    """
+    state: CollectionState
+    remaining: Set[Location]
+    """locations that were not reachable yet"""
+    _candidates: Set[Location]
+    _retry: Set[Location]
+    _region_waiting: Dict[Region, Set[Location]]
+    _item_waiting: Dict[int, Dict[str, Tuple[int, Set[Location]]]]
+
+    def __init__(self, state: CollectionState, locations: Iterable[Location]):
+        self.state = state
+        self.remaining = set(locations)
+        self._candidates = set(self.remaining)
+        self._retry = set()
+        self._region_waiting = {}
+        self._item_waiting = {}
+
+    def next_sphere(self) -> Set[Location]:
+        """Removes and returns the remaining locations that are reachable with the state as it is now."""
+        state = self.state
+        candidates = self._candidates | self._retry
+        self._candidates = set()
+        self._retry = set()
+        for region in [region for region in self._region_waiting if region.can_reach(state)]:
+            candidates |= self._region_waiting.pop(region)
+        for player, waiting in self._item_waiting.items():
+            player_items = state.prog_items[player]
+            for name in [name for name, (count, _) in waiting.items() if player_items[name] != count]:
+                candidates |= waiting.pop(name)[1]
+
+        remaining = self.remaining
+        sphere = {location for location in candidates if location in remaining and self._can_reach(location)}
+        remaining -= sphere
+        return sphere
+
+    def _can_reach(self, location: Location) -> bool:
+        state = self.state
+        region = location.parent_region
+        if type(location).can_reach is not Location.can_reach or type(region).can_reach is not Region.can_reach:
+            if location.can_reach(state):
+                return True
+            self._retry.add(location)
+            return False
+        if not region.can_reach(state):
+            self._region_waiting.setdefault(region, set()).add(location)
+            return False
+
+        saved = _ItemReadRecorder.record(state, location.player)
+        try:
+            reachable = location.access_rule(state)
+        finally:
+            reads = _ItemReadRecorder.restore(state, saved)
+        if reachable:
+            return True
+        if reads is None:
+            self._retry.add(location)
+        else:
+            player_items = state.prog_items[location.player]
+            waiting = self._item_waiting.setdefault(location.player, {})
+            for name in reads:
+                waiting.setdefault(name, (player_items[name], set()))[1].add(location)
+        return False
+
+
 class Entrance:
     access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
     hide_path: bool = False
@@ -853,6 +1018,9 @@ class Region:
         def __len__(self) -> int:
             return self._list.__len__()
 
+        def __iter__(self) -> Iterator[Location]:
+            return self._list.__iter__()
+
         # This seems to not be needed, but that's a bit suspicious.
         # def __del__(self):
         #     self.clear()
@@ -1183,19 +1351,18 @@ class Spoiler:
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
         state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
+        sphere_candidates = SphereFrontier(state, prog_locations)
         logging.debug('Building up collection spheres.')
-        while sphere_candidates:
+        while sphere_candidates.remaining:
 
             # build up spheres of collection radius.
             # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
 
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
+            sphere = sphere_candidates.next_sphere()
 
             for location in sphere:
                 state.collect(location.item, True, location)
 
-            sphere_candidates -= sphere
             collection_spheres.append(sphere)
             state_cache.append(state.copy())
 
@@ -1203,14 +1370,15 @@ class Spoiler:
                           len(sphere),
                           len(prog_locations))
             if not sphere:
+                unreachable = sphere_candidates.remaining
                 logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
                     location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if any([multiworld.accessibility[location.item.player] != 'minimal' for location in sphere_candidates]):
-                    raise RuntimeError(f'Not all progression items reachable ({sphere_candidates}). '
+                                                                               unreachable])
+                if any([multiworld.accessibility[location.item.player] != 'minimal' for location in unreachable]):
+                    raise RuntimeError(f'Not all progression items reachable ({unreachable}). '
                                        f'Something went terribly wrong here.')
                 else:
-                    self.unreachables = sphere_candidates
+                    self.unreachables = unreachable
                     break
 
         # in the second phase, we cull each sphere such that the game is still beatable,
@@ -1251,25 +1419,24 @@ class Spoiler:
         # used to access it was deemed not required.) So we need to do one final sphere collection pass
         # to build up the correct spheres
 
-        required_locations = {item for sphere in collection_spheres for item in sphere}
         state = CollectionState(multiworld)
+        required_locations = SphereFrontier(state, (item for sphere in collection_spheres for item in sphere))
         collection_spheres = []
-        while required_locations:
+        while required_locations.remaining:
             state.sweep_for_events(key_only=True)
 
-            sphere = set(filter(state.can_reach, required_locations))
+            sphere = required_locations.next_sphere()
 
             for location in sphere:
                 state.collect(location.item, True, location)
 
-            required_locations -= sphere
-
             collection_spheres.append(sphere)
 
             logging.debug('Calculated final sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere), len(required_locations))
+                          len(sphere), len(required_locations.remaining))
             if not sphere:
-                raise RuntimeError(f'Not all required items reachable. Unreachable locations: {required_locations}')
+                raise RuntimeError(f'Not all required items reachable. '
+                                   f'Unreachable locations: {required_locations.remaining}')
 
         # we can finally output our playthrough
         self.playthrough = {"0": sorted([self.multiworld.get_name_string_for_object(item) for item in
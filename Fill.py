@@ -1,11 +1,14 @@
 import collections
+import functools
 import itertools
 import logging
+import time
 import typing
 from collections import Counter, deque
 
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
 from Options import Accessibility
+from Utils import profile_step, report_generation_progress
 
 from worlds.AutoWorld import call_all
 from worlds.generic.Rules import add_item_rule
@@ -27,6 +30,163 @@ def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item]
     return new_state
 
 
+class MaximumExplorationState:
+    """
+    Creates maximum exploration states for an item pool that items get taken out of in a known order, without
+    collecting the whole pool from base_state again for each of them.
+    The pool is collected in reverse order, keeping a copy of the state every few items. A sweep copies the checkpoint
+    with the fewest items that still has all of the pool and collects the rest on top.
+    Not every World.remove undoes its World.collect, so items are never removed from a state. Instead, taking an item
+    out of order, or adding back more items than there are between two checkpoints, collects the pool again.
+    Events are always swept from scratch, as access rules may look at placements, which change between sweeps.
+    """
+    checkpoint_count: typing.ClassVar[int] = 16
+
+    base_state: CollectionState
+    itempool: typing.List[Item]
+    removed: int
+    added: typing.List[Item]
+    interval: int
+    checkpoints: typing.Dict[int, CollectionState]
+
+    def __init__(self, base_state: CollectionState, itempool: typing.Iterable[Item] = tuple()) -> None:
+        """
+        :param base_state: State assumed before any of the pool is collected.
+        :param itempool: Items in the order they are expected to be taken out in.
+        """
+        self.base_state = base_state
+        self._plan(list(itempool))
+
+    def _plan(self, itempool: typing.List[Item]) -> None:
+        self.itempool = itempool
+        self.removed = 0
+        self.added = []
+        self.interval = max(1, -(-len(itempool) // self.checkpoint_count))
+        state = self.base_state.copy()
+        self.checkpoints = {len(itempool): state.copy()}
+        for index in reversed(range(len(itempool))):
+            state.collect(itempool[index], True)
+            if not index % self.interval:
+                self.checkpoints[index] = state.copy() if index else state
+
+    def collect(self, item: Item) -> None:
+        self.added.append(item)
+
+    def remove(self, item: Item) -> None:
+        if self.removed < len(self.itempool) and self.itempool[self.removed] is item:
+            self.checkpoints.pop(self.removed, None)
+            self.removed += 1
+            return
+        for index, added_item in enumerate(self.added):
+            if added_item is item:
+                self.added.pop(index)
+                return
+        for index in range(self.removed, len(self.itempool)):
+            if self.itempool[index] is item:
+                self._plan(self.itempool[self.removed:index] + self.itempool[index + 1:] + self.added)
+                return
+        raise ValueError(f"{item} is not in the item pool.")
+
+    def sweep(self) -> CollectionState:
+        """Returns a new state with every item of the pool and every reachable event collected."""
+        if len(self.added) > self.interval:
+            self._plan(self.itempool[self.removed:] + self.added)
+        checkpoint = min(-(-self.removed // self.interval) * self.interval, len(self.itempool))
+        new_state = self.checkpoints[checkpoint].copy()
+        for item in itertools.chain(self.itempool[self.removed:checkpoint], self.added):
+            new_state.collect(item, True)
+        new_state.sweep_for_events()
+        return new_state
+
+
+class LocationCandidates:
+    """
+    Index over the locations fill_restrictive places into. Finds the same location a scan of the list in order would,
+    but skips locations taken so far, and locations whose access check failed in the state asked about last.
+    Locations are bucketed by player for single player placement, and by whether their item rules are the defaults,
+    which don't need to be called.
+    Taken locations are only removed from the list once remaining is called.
+    """
+    locations: typing.List[Location]
+    taken: typing.List[bool]
+    default_rules: typing.List[bool]
+    player_positions: typing.Dict[int, typing.List[int]]
+    starts: typing.Dict[typing.Optional[int], int]
+    unreachable: typing.Set[int]
+    state: typing.Optional[CollectionState]
+    count: int
+
+    def __init__(self, locations: typing.List[Location]) -> None:
+        self.locations = locations
+        self.taken = [False] * len(locations)
+        self.default_rules = [location.item_rule is Location.item_rule
+                              and location.always_allow is Location.always_allow for location in locations]
+        self.player_positions = {}
+        for position, location in enumerate(locations):
+            self.player_positions.setdefault(location.player, []).append(position)
+        self.starts = {}
+        self.unreachable = set()
+        self.state = None
+        self.count = len(locations)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def take(self, state: CollectionState, item: Item, check_access: bool = True,
+             player: typing.Optional[int] = None) -> typing.Optional[Location]:
+        """
+        Takes the first location that can_fill item in state, out of those belonging to player if given.
+        Access rules are assumed to only depend on the state while it is the same one.
+        """
+        if state is not self.state:
+            self.state = state
+            self.unreachable.clear()
+        positions: typing.Sequence[int] = self.player_positions.get(player, ()) if player is not None \
+            else range(len(self.locations))
+        start = self.starts.get(player, 0)
+        while start < len(positions) and self.taken[positions[start]]:
+            start += 1
+        self.starts[player] = start
+
+        non_local_items = state.multiworld.non_local_items[item.player]
+        important = item.advancement or item.useful
+        for position in itertools.islice(positions, start, None):
+            if self.taken[position]:
+                continue
+            location = self.locations[position]
+            # same checks as Location.can_fill
+            default_rules = self.default_rules[position]
+            if default_rules or not location.always_allow(state, item) or item.name in non_local_items:
+                if important and location.progress_type == LocationProgressType.EXCLUDED:
+                    continue
+                if not default_rules and not location.item_rule(item):
+                    continue
+                if check_access:
+                    if position in self.unreachable:
+                        continue
+                    if not location.can_reach(state):
+                        self.unreachable.add(position)
+                        continue
+            self.taken[position] = True
+            self.count -= 1
+            return location
+        return None
+
+    def remaining(self) -> typing.List[Location]:
+        """Returns the locations that were not taken, in their original order."""
+        return [location for location, taken in zip(self.locations, self.taken) if not taken]
+
+
+def profiled_fill(fill: typing.Callable[..., None]) -> typing.Callable[..., None]:
+    """Measures each call of fill as a profiler step, named after its name keyword argument."""
+    @functools.wraps(fill)
+    def profiled(world: MultiWorld, *args: typing.Any, **kwargs: typing.Any) -> None:
+        with profile_step(world.profiler, "fill", kwargs.get("name", "Unknown")):
+            fill(world, *args, **kwargs)
+    return profiled
+
+
+@profiled_fill
 def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -42,7 +202,7 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
     :param on_place: callback that is called when a placement happens
     :param allow_partial: only place what is possible. Remaining items will be in the item_pool list.
     :param allow_excluded: if true and placement fails, it is re-attempted while ignoring excluded on Locations
-    :param name: name of this fill step for progress logging purposes
+    :param name: name of this fill step for progress logging and profiling purposes
     """
     unplaced_items: typing.List[Item] = []
     placements: typing.List[Location] = []
@@ -56,7 +216,14 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    # items are taken out one per player at a time, from the end of each player's deque
+    exploration = MaximumExplorationState(base_state, [
+        items[-index] for index in range(1, max(map(len, reachable_items.values()), default=0) + 1)
+        for items in reachable_items.values() if len(items) >= index])
+
+    candidates = LocationCandidates(locations)
+
+    while any(reachable_items.values()) and candidates:
         # grab one item per player
         items_to_place = [items.pop()
                           for items in reachable_items.values() if items]
@@ -65,15 +232,17 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
                 if pool_item is item:
                     item_pool.pop(p)
                     break
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items)
+            exploration.remove(item)
+        maximum_exploration_state = exploration.sweep()
 
         has_beaten_game = world.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not candidates:
                 unplaced_items += items_to_place
+                for item in items_to_place:
+                    exploration.collect(item)
                 break
             item_to_place = items_to_place.pop(0)
 
@@ -87,15 +256,9 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
-            else:
+            spot_to_fill = candidates.take(maximum_exploration_state, item_to_place, perform_access_check,
+                                           item_to_place.player if single_player_placement else None)
+            if spot_to_fill is None:
                 # we filled all reachable spots.
                 if swap:
                     # try swapping this item with previously placed items in a safe way then in an unsafe way
@@ -139,6 +302,7 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
                                 reachable_items[placed_item.player].appendleft(
                                     placed_item)
                                 item_pool.append(placed_item)
+                                exploration.collect(placed_item)
 
                                 # cleanup at the end to hopefully get better errors
                                 cleanup_required = True
@@ -152,15 +316,18 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
+                        exploration.collect(item_to_place)
                         continue
                 else:
                     unplaced_items.append(item_to_place)
+                    exploration.collect(item_to_place)
                     continue
             world.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
             placements.append(spot_to_fill)
             spot_to_fill.event = item_to_place.advancement
             placed += 1
+            report_generation_progress(name, placed, total)
             if not placed % 1000:
                 _log_fill_progress(name, placed, total)
             if on_place:
@@ -169,6 +336,8 @@ def fill_restrictive(world: MultiWorld, base_state: CollectionState, locations:
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
+    locations[:] = candidates.remaining()
+
     if cleanup_required:
         # validate all placements and remove invalid ones
         state = sweep_from_pool(base_state, [])
@@ -264,6 +433,7 @@ def remaining_fill(world: MultiWorld,
         world.push_item(spot_to_fill, item_to_place, False)
         placements.append(spot_to_fill)
         placed += 1
+        report_generation_progress("Remaining", placed, total)
         if not placed % 1000:
             _log_fill_progress("Remaining", placed, total)
 
@@ -570,6 +740,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         state: CollectionState = CollectionState(multiworld)
         checked_locations: typing.Set[Location] = set()
         unchecked_locations: typing.Set[Location] = set(multiworld.get_locations())
+        location_count = len(unchecked_locations)
 
         total_locations_count: typing.Counter[int] = Counter(
             location.player
@@ -588,6 +759,10 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        balancing_start = time.perf_counter()
+        # spheres explored ahead by balancing, each with the state it was found with. They are replayed by
+        # later iterations instead of sweeping again, until items are moved into earlier spheres.
+        explored_spheres: typing.Deque[typing.Tuple[typing.Set[Location], CollectionState]] = deque()
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
@@ -602,14 +777,20 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             return
 
         while True:
+            sphere_start = time.perf_counter()
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if explored_spheres:
+                sphere_locations, state = explored_spheres.popleft()
+            else:
+                sphere_locations = get_sphere_locations(state, unchecked_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
                     reachable_locations_count[location.player] += 1
+            report_generation_progress("Progression balancing", location_count - len(unchecked_locations),
+                                       location_count)
 
             logging.debug(f"Sphere {sphere_num}")
             logging.debug(f"Reachable locations: {reachable_locations_count}")
@@ -640,11 +821,18 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                     balancing_reachables = reachable_locations_count.copy()
                     balancing_sphere = sphere_locations.copy()
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
+                    explored_index = 0
+                    balancing_state_is_explored = False
                     while True:
+                        replay = explored_index < len(explored_spheres)
+                        if not replay and balancing_state_is_explored:
+                            balancing_state = balancing_state.copy()
+                            balancing_state_is_explored = False
                         # Check locations in the current sphere and gather progression items to swap earlier
                         for location in balancing_sphere:
                             if location.event:
-                                balancing_state.collect(location.item, True, location)
+                                if not replay:
+                                    balancing_state.collect(location.item, True, location)
                                 player = location.item.player
                                 # only replace items that end up in another player's world
                                 if (not location.locked and not location.item.skip_in_prog_balancing and
@@ -653,7 +841,13 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        if replay:
+                            balancing_sphere, balancing_state = explored_spheres[explored_index]
+                            balancing_state_is_explored = True
+                        else:
+                            balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                            explored_spheres.append((balancing_sphere, balancing_state.copy()))
+                        explored_index += 1
                         for location in balancing_sphere:
                             balancing_unchecked_locations.remove(location)
                             if not location.locked:
@@ -723,6 +917,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
 
                     if old_moved_item_count < moved_item_count:
                         logging.debug(f"Moved {moved_item_count} items so far\n")
+                        explored_spheres.clear()
                         unlocked = {fresh for player in balancing_players for fresh in unlocked_locations[player]}
                         for location in get_sphere_locations(state, unlocked):
                             unchecked_locations.remove(location)
@@ -734,6 +929,7 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 if location.event:
                     state.collect(location.item, True, location)
             checked_locations |= sphere_locations
+            logging.debug(f"Sphere {sphere_num - 1} took {time.perf_counter() - sphere_start:.4f} seconds.")
 
             if multiworld.has_beaten_game(state):
                 break
@@ -741,6 +937,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                 logging.warning("Progression Balancing ran out of paths.")
                 break
 
+        logging.info(f"Progression balancing moved {moved_item_count} items in "
+                     f"{time.perf_counter() - balancing_start:.2f} seconds.")
+
 
 def swap_location_item(location_1: Location, location_2: Location, check_locked: bool = True) -> None:
     """Swaps Items of locations. Does NOT swap flags like shop_slot or locked, but does swap event"""
@@ -2,18 +2,16 @@ import collections
 import concurrent.futures
 import logging
 import os
-import pickle
 import tempfile
 import time
 import zipfile
-import zlib
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, Region
 from Fill import balance_multiworld_progression, distribute_items_restrictive, distribute_planned, flood_items
 from Options import StartInventoryPool
-from Utils import __version__, output_path, version_tuple
+from Utils import __version__, dump_multidata, output_path, profile_step, report_generation_progress, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -32,6 +30,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
     start = time.perf_counter()
     # initialize the world
     world = MultiWorld(args.multi)
+    world.profiler = getattr(args, "profiler", None)
 
     logger = logging.getLogger()
     world.set_seed(seed, args.race, str(args.outputname) if args.outputname else None)
@@ -286,7 +285,8 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     logger.info("Running Item Plando.")
 
-    distribute_planned(world)
+    with profile_step(world.profiler, "generation", "distribute_planned"):
+        distribute_planned(world)
 
     logger.info('Running Pre Main Fill.')
 
@@ -294,15 +294,17 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     logger.info(f'Filling the world with {len(world.itempool)} items.')
 
-    if world.algorithm == 'flood':
-        flood_items(world)  # different algo, biased towards early game progress items
-    elif world.algorithm == 'balanced':
-        distribute_items_restrictive(world)
+    with profile_step(world.profiler, "generation", "main_fill"):
+        if world.algorithm == 'flood':
+            flood_items(world)  # different algo, biased towards early game progress items
+        elif world.algorithm == 'balanced':
+            distribute_items_restrictive(world)
 
     AutoWorld.call_all(world, 'post_fill')
 
     if world.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(world)
+        with profile_step(world.profiler, "generation", "progression_balancing"):
+            balance_multiworld_progression(world)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -311,8 +313,15 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
 
     if args.skip_output:
         logger.info('Done. Skipped output/spoiler generation. Total Time: %s', time.perf_counter() - start)
+        write_profile(world)
         return world
 
+    def profiled(name: str, function, *function_args):
+        with profile_step(world.profiler, "output", name):
+            result = function(*function_args)
+        report_generation_progress(name, 1, 1)
+        return result
+
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + world.seed_name
 
@@ -321,7 +330,7 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
         output_players = [player for player in world.player_ids if AutoWorld.World.generate_output.__code__
                           is not world.worlds[player].generate_output.__code__]
         with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(world.fulfills_accessibility)
+            check_accessibility_task = pool.submit(profiled, "fulfills_accessibility", world.fulfills_accessibility)
 
             output_file_futures = [pool.submit(AutoWorld.call_stage, world, "generate_output", temp_dir)]
             for player in output_players:
@@ -415,13 +424,10 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 }
                 AutoWorld.call_all(world, "modify_multidata", multidata)
 
-                multidata = zlib.compress(pickle.dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(multidata)
+                    dump_multidata(multidata, f, get_settings().generator.multidata_compression_level)
 
-            output_file_futures.append(pool.submit(write_multidata))
+            output_file_futures.append(pool.submit(profiled, "write_multidata", write_multidata))
             if not check_accessibility_task.result():
                 if not world.can_beat_game():
                     raise Exception("Game appears as unbeatable. Aborting.")
@@ -433,13 +439,14 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 if i % 10 == 0 or i == len(output_file_futures):
                     logger.info(f'Generating output files ({i}/{len(output_file_futures)}).')
                 future.result()
+                report_generation_progress("Output", i, len(output_file_futures))
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            world.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            profiled("create_playthrough", world.spoiler.create_playthrough, args.spoiler > 2)
 
         if args.spoiler:
-            world.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            profiled("spoiler", world.spoiler.to_file, os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
         zipfilename = output_path(f"AP_{world.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
@@ -449,4 +456,12 @@ def main(args, seed=None, baked_server_options: Optional[Dict[str, object]] = No
                 zf.write(file.path, arcname=file.name)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
+    write_profile(world)
     return world
+
+
+def write_profile(multiworld: MultiWorld) -> None:
+    if multiworld.profiler:
+        profile_path = output_path(f"AP_{multiworld.seed_name}_profile.json")
+        multiworld.profiler.write(profile_path)
+        logging.info(f"Wrote generation profile to {profile_path}")
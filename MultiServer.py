@@ -12,6 +12,7 @@ import itertools
 import logging
 import math
 import operator
+import os
 import pickle
 import random
 import threading
@@ -145,6 +146,10 @@ team_slot = typing.Tuple[int, int]
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
+    team_broadcast_batch_size = 500
+    # encoded game data packages by checksum, shared by all rooms of this process
+    encoded_game_packages: typing.ClassVar[typing.OrderedDict[str, str]] = collections.OrderedDict()
+    encoded_game_packages_size = 256
 
     simple_options = {"hint_cost": int,
                       "location_check_points": int,
@@ -185,6 +190,10 @@ class Context:
         self.log_network = log_network
         self.endpoints = []
         self.clients = {}
+        # authenticated clients by (team, tag) and (team, game), for Bounce
+        self.clients_by_tag: typing.Dict[typing.Tuple[int, str], typing.Set[Client]] = {}
+        self.clients_by_game: typing.Dict[typing.Tuple[int, str], typing.Set[Client]] = {}
+        self.team_broadcast_queue: typing.Dict[int, typing.List[dict]] = {}
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
@@ -201,6 +210,7 @@ class Context:
         self.server = None
         self.countdown_timer = 0
         self.received_items = {}
+        self.received_items_changed: typing.Set[team_slot] = set()  # slots send_new_items has to look at
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -208,6 +218,9 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[NetUtils.Hint]] = collections.defaultdict(set)
+        # (team, finding_player, location) -> slots remembering a not yet found hint for that location
+        self.unfound_hints: typing.Dict[typing.Tuple[int, int, int], typing.List[typing.Tuple[int, NetUtils.Hint]]] \
+            = collections.defaultdict(list)
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -226,6 +239,13 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread = None
         self.save_dirty = False
+        self.save_lock = threading.Lock()
+        # pickled changes since the last snapshot, None while journaling is disabled
+        self.save_journal: typing.Optional[typing.Deque[bytes]] = None
+        self.save_journal_size = 0  # bytes in the journal file on disk
+        self.save_snapshot_size = 0  # uncompressed bytes of the last snapshot
+        self.save_snapshot_number = 0  # counts snapshots, journals start with the number of the snapshot they follow
+        self.save_journal_state: typing.Optional[bytes] = None  # last state record written
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -240,6 +260,7 @@ class Context:
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
         self.checksums = {}
+        self.encoded_unversioned_game_packages: typing.Dict[str, str] = {}  # by game, for packages without checksum
         self.item_name_groups = {}
         self.location_name_groups = {}
         self.all_item_and_group_names = {}
@@ -273,6 +294,31 @@ class Context:
             self.all_location_and_group_names[game_name] = \
                 set(game_package["location_name_to_id"]) | set(self.location_name_groups.get(game_name, []))
 
+    def get_encoded_game_package(self, game: str) -> str:
+        """Returns the encoded data package of game, encoding each package only once."""
+        game_package = self.gamespackage[game]
+        checksum = game_package.get("checksum")
+        if not checksum:
+            encoded = self.encoded_unversioned_game_packages.get(game)
+            if encoded is None:
+                encoded = self.encoded_unversioned_game_packages[game] = self.dumper(game_package)
+            return encoded
+        encoded_game_packages = self.encoded_game_packages
+        encoded = encoded_game_packages.get(checksum)
+        if encoded is None:
+            encoded = encoded_game_packages[checksum] = self.dumper(game_package)
+            if len(encoded_game_packages) > self.encoded_game_packages_size:
+                encoded_game_packages.popitem(last=False)
+        else:
+            encoded_game_packages.move_to_end(checksum)
+        return encoded
+
+    def encode_data_package(self, games: typing.Iterable[str]) -> str:
+        """Encodes a DataPackage message for games by splicing together their cached encoded packages,
+        the same as dumper would have written it."""
+        encoded_games = ",".join(f"{self.dumper(game)}:{self.get_encoded_game_package(game)}" for game in games)
+        return f'[{{"cmd":"DataPackage","data":{{"games":{{{encoded_games}}}}}}}]'
+
     def item_names_for_game(self, game: str) -> typing.Optional[typing.Dict[str, int]]:
         return self.gamespackage[game]["item_name_to_id"] if game in self.gamespackage else None
 
@@ -342,13 +388,60 @@ class Context:
         msgs = self.dumper(msgs)
         async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
 
+    def broadcast_team_batched(self, team: int, msgs: typing.List[dict]):
+        """Like broadcast_team, but messages are gathered until the next loop iteration
+        and then encoded and sent once per team."""
+        if not self.team_broadcast_queue:
+            async_start(self.flush_team_broadcasts())
+        self.team_broadcast_queue.setdefault(team, []).extend(msgs)
+
+    async def flush_team_broadcasts(self):
+        queued, self.team_broadcast_queue = self.team_broadcast_queue, {}
+        for team, msgs in queued.items():
+            endpoints = list(itertools.chain.from_iterable(self.clients[team].values()))
+            # stay well below the default 1 MiB frame limit of websockets clients
+            for start in range(0, len(msgs), self.team_broadcast_batch_size):
+                encoded = self.dumper(msgs[start:start + self.team_broadcast_batch_size])
+                await self.broadcast_send_encoded_msgs(endpoints, encoded)
+
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
             self.endpoints.remove(endpoint)
         if endpoint.slot and endpoint in self.clients[endpoint.team][endpoint.slot]:
             self.clients[endpoint.team][endpoint.slot].remove(endpoint)
+            self.unindex_client(endpoint)
         await on_client_disconnected(self, endpoint)
 
+    def index_client(self, client: Client):
+        """Add an authenticated client to the tag and game indexes, after its team, slot and tags are set."""
+        self.clients_by_game.setdefault((client.team, self.games[client.slot]), set()).add(client)
+        for tag in client.tags:
+            self.clients_by_tag.setdefault((client.team, tag), set()).add(client)
+
+    def unindex_client(self, client: Client):
+        """Remove a client from the tag and game indexes, before its team, slot or tags change."""
+        keys = [(self.clients_by_game, (client.team, self.games[client.slot]))]
+        keys += [(self.clients_by_tag, (client.team, tag)) for tag in client.tags]
+        for index, key in keys:
+            clients = index.get(key)
+            if clients is not None:
+                clients.discard(client)
+                if not clients:
+                    del index[key]
+
+    def bounce_targets(self, team: int, games: typing.Iterable[str], tags: typing.Iterable[str],
+                       slots: typing.Iterable[int]) -> typing.Set[Client]:
+        """Clients of team that play one of games, have one of tags or are connected to one of slots."""
+        targets: typing.Set[Client] = set()
+        for game in games:
+            targets.update(self.clients_by_game.get((team, game), ()))
+        for tag in tags:
+            targets.update(self.clients_by_tag.get((team, tag), ()))
+        team_clients = self.clients[team]
+        for slot in slots:
+            targets.update(team_clients.get(slot, ()))
+        return targets
+
     def notify_client(self, client: Client, text: str, additional_arguments: dict = {}):
         if not client.auth:
             return
@@ -382,10 +475,7 @@ class Context:
 
     @staticmethod
     def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        return Utils.load_multidata(data)
 
     def _load(self, decoded_obj: dict, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -435,7 +525,8 @@ class Context:
             self.start_inventory[slot] = [NetworkItem(item_code, -2, 0) for item_code in item_codes]
 
         for slot, hints in decoded_obj["precollected_hints"].items():
-            self.hints[0, slot].update(hints)
+            for hint in hints:
+                self.add_hint(0, slot, hint)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -479,31 +570,149 @@ class Context:
 
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            with self.save_lock:
+                if self.save_journal is None:
+                    self._save_snapshot()
+                else:
+                    records = self._drain_save_journal()
+                    state = pickle.dumps(("state", self._get_save_state()))
+                    if state != self.save_journal_state:
+                        records.append(state)
+                    journal_size = self.save_journal_size + sum(len(record) for record in records)
+                    if exit_save or not self.save_snapshot_size or journal_size > self.save_snapshot_size:
+                        self._save_snapshot()
+                    else:
+                        with open(self.save_journal_filename, "ab") as f:
+                            f.write(b"".join(records))
+                        self.save_journal_size = journal_size
+                        self.save_journal_state = state
         except Exception as e:
             logging.exception(e)
             return False
         else:
             return True
 
+    @property
+    def save_journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
+    def _save_snapshot(self):
+        """Write the full save and, if journaling, start a new journal for it.
+        The snapshot replaces the old one whole, the old journal is recognized as stale by its snapshot number
+        should the server stop before it is replaced as well."""
+        if self.save_journal is not None:
+            # changes made while the snapshot is taken stay queued, replaying them on top of it is harmless
+            self._drain_save_journal()
+        snapshot_number = self.save_snapshot_number + 1
+        encoded_save = pickle.dumps({**self.get_save(), "snapshot_number": snapshot_number})
+        temp_filename = self.save_filename + ".tmp"
+        with open(temp_filename, "wb") as f:
+            f.write(zlib.compress(encoded_save))
+        os.replace(temp_filename, self.save_filename)
+        self.save_snapshot_number = snapshot_number
+        self.save_snapshot_size = len(encoded_save)
+        if self.save_journal is not None:
+            self._start_save_journal()
+
+    def _start_save_journal(self):
+        header = pickle.dumps(("snapshot", self.save_snapshot_number))
+        with open(self.save_journal_filename, "wb") as f:
+            f.write(header)
+        self.save_journal_size = len(header)
+        self.save_journal_state = None
+
+    def _drain_save_journal(self) -> typing.List[bytes]:
+        records = []
+        while self.save_journal:
+            records.append(self.save_journal.popleft())
+        return records
+
+    def journal_save(self, *record):
+        """Remember a change for the next incremental save. Call after the change was applied."""
+        if self.save_journal is not None:
+            self.save_journal.append(pickle.dumps(record))
+
+    def load_save_journal(self) -> int:
+        """Replay the journal written since the last snapshot, returns the number of applied records.
+        A journal left over from an older snapshot is skipped, as the snapshot already contains its changes."""
+        count = 0
+        current = False
+        try:
+            with open(self.save_journal_filename, "rb") as f:
+                unpickler = Utils.RestrictedUnpickler(f)
+                while True:
+                    self.save_journal_size = f.tell()
+                    try:
+                        record = unpickler.load()
+                    except EOFError:
+                        break
+                    except (pickle.UnpicklingError, ValueError, TypeError, AttributeError) as e:
+                        # a torn write at the end of the journal, everything before it is valid
+                        logging.warning(f"Stopped reading save journal at a damaged record: {e}")
+                        break
+                    if record[0] == "snapshot":
+                        current = record[1] == self.save_snapshot_number
+                        if not current:
+                            logging.info("Skipped save journal of an older snapshot.")
+                            break
+                        continue
+                    self.apply_save_journal_record(record)
+                    count += 1
+            # drop a damaged tail, so new records are not appended behind it
+            os.truncate(self.save_journal_filename, self.save_journal_size)
+        except FileNotFoundError:
+            pass
+        if not current:
+            # write a snapshot and a new journal with the next save, before anything is appended to this one
+            self.save_snapshot_size = 0
+        if count:
+            self.recheck_hints()
+        return count
+
+    def apply_save_journal_record(self, record: tuple):
+        kind = record[0]
+        if kind == "location_checks":
+            _, team, slot, locations = record
+            self.location_checks[team, slot] |= locations
+        elif kind == "received_items":
+            _, team, slot, remote_items, index, items = record
+            received_items = get_received_items(self, team, slot, remote_items)
+            # the snapshot may already contain these items
+            if len(received_items) == index:
+                received_items.extend(items)
+        elif kind == "hint":
+            _, team, slot, hint = record
+            self.hints[team, slot].add(hint)
+        elif kind == "stored_data":
+            _, key, value = record
+            self.stored_data[key] = value
+        elif kind == "state":
+            self._set_save_state(record[1])
+        else:
+            raise Exception(f"Unknown save journal record {kind}.")
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
             if not self.save_filename:
-                import os
                 name, ext = os.path.splitext(self.data_filename)
                 self.save_filename = name + '.apsave' if ext.lower() in ('.archipelago', '.zip') \
                     else self.data_filename + '_' + 'apsave'
             try:
                 with open(self.save_filename, 'rb') as f:
-                    save_data = restricted_loads(zlib.decompress(f.read()))
+                    encoded_save = zlib.decompress(f.read())
+                    save_data = restricted_loads(encoded_save)
                     self.set_save(save_data)
+                    self.save_snapshot_number = save_data.get("snapshot_number", 0)
+                    self.save_snapshot_size = len(encoded_save)
+                replayed = self.load_save_journal()
+                if replayed:
+                    logging.info(f"Replayed {replayed} changes from save journal.")
             except FileNotFoundError:
                 logging.error('No save data found, starting a new game')
             except Exception as e:
                 logging.exception(e)
+            self.save_journal = collections.deque()
             self._start_async_saving()
 
     def _start_async_saving(self):
@@ -534,14 +743,22 @@ class Context:
             atexit.register(self._save, True)  # make sure we save on exit too
 
     def get_save(self) -> dict:
-        self.recheck_hints()
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
             "received_items": self.received_items,
-            "hints_used": dict(self.hints_used),
             "hints": dict(self.hints),
             "location_checks": dict(self.location_checks),
+            "stored_data": self.stored_data,
+            **self._get_save_state()
+        }
+
+        return d
+
+    def _get_save_state(self) -> dict:
+        """Small parts of the save that are written whole, both in snapshots and in the journal."""
+        return {
+            "hints_used": dict(self.hints_used),
             "name_aliases": self.name_aliases,
             "client_game_state": dict(self.client_game_state),
             "client_activity_timers": tuple(
@@ -550,26 +767,33 @@ class Context:
                 (key, value.timestamp()) for key, value in self.client_connection_timers.items()),
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
-            "stored_data": self.stored_data,
             "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
                              "server_password": self.server_password, "password": self.password,
                              "release_mode": self.release_mode,
                              "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
                              "item_cheat": self.item_cheat, "compatibility": self.compatibility}
-
         }
 
-        return d
-
     def set_save(self, savedata: dict):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
             raise Exception("This savegame is newer than the server.")
         self.received_items = savedata["received_items"]
-        self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.location_checks.update(savedata["location_checks"])
+        self.recheck_hints()
+        self._set_save_state(savedata)
 
+        if "stored_data" in savedata:
+            self.stored_data = savedata["stored_data"]
+        # count items and slots from lists for items_handling = remote
+        logging.info(
+            f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
+            f'for {sum(k[2] for k in self.received_items)} players')
+
+    def _set_save_state(self, savedata: dict):
+        self.hints_used.update(savedata["hints_used"])
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
         self.client_connection_timers.update(
@@ -578,7 +802,6 @@ class Context:
         self.client_activity_timers.update(
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
-        self.location_checks.update(savedata["location_checks"])
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
@@ -595,13 +818,6 @@ class Context:
         if "group_collected" in savedata:
             self.group_collected = savedata["group_collected"]
 
-        if "stored_data" in savedata:
-            self.stored_data = savedata["stored_data"]
-        # count items and slots from lists for items_handling = remote
-        logging.info(
-            f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
-            f'for {sum(k[2] for k in self.received_items)} players')
-
     # rest
 
     def get_hint_cost(self, slot):
@@ -610,17 +826,38 @@ class Context:
         return 0
 
     def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None):
+        """Re-check every remembered hint against location_checks and rebuild the unfound hint index.
+        Only needed after hints or checks were loaded, register_location_checks keeps them up to date."""
         for hint_team, hint_slot in self.hints:
             if (team is None or team == hint_team) and (slot is None or slot == hint_slot):
                 self.hints[hint_team, hint_slot] = {
                     hint.re_check(self, hint_team) for hint in
                     self.hints[hint_team, hint_slot]
                 }
+        self.unfound_hints.clear()
+        for (hint_team, hint_slot), hints in self.hints.items():
+            for hint in hints:
+                if not hint.found:
+                    self.unfound_hints[hint_team, hint.finding_player, hint.location].append((hint_slot, hint))
 
     def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
         return self.hints[team, slot]
 
+    def add_hint(self, team: int, slot: int, hint: NetUtils.Hint):
+        """Remember hint for slot, indexing it so it gets marked found once its location is checked."""
+        hint = hint.re_check(self, team)
+        self.hints[team, slot].add(hint)
+        if not hint.found:
+            self.unfound_hints[team, hint.finding_player, hint.location].append((slot, hint))
+
+    def mark_hints_found(self, team: int, finding_player: int, locations: typing.Iterable[int]):
+        for location in locations:
+            for slot, hint in self.unfound_hints.pop((team, finding_player, location), ()):
+                hints = self.hints[team, slot]
+                if hint in hints:
+                    hints.remove(hint)
+                    hints.add(hint._replace(found=True))
+
     def get_players_package(self):
         return [NetworkPlayer(t, p, self.get_aliased_name(t, p), n) for (t, p), n in self.player_names.items()]
 
@@ -675,10 +912,12 @@ class Context:
                 # since hints are bidirectional, finding player and receiving player,
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
-                    self.hints[team, hint.finding_player].add(hint)
+                    self.add_hint(team, hint.finding_player, hint)
+                    self.journal_save("hint", team, hint.finding_player, hint)
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
-                        self.hints[team, player].add(hint)
+                        self.add_hint(team, player, hint)
+                        self.journal_save("hint", team, player, hint)
                         new_hint_events.add(player)
 
             logging.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -885,20 +1124,20 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
-                    client.send_index = len(start_inventory) + len(items)
+    changed, ctx.received_items_changed = ctx.received_items_changed, set()
+    for team, slot in sorted(changed):
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if client.no_items:
+                continue
+            start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
+            items = get_received_items(ctx, team, slot, client.remote_items)
+            if len(start_inventory) + len(items) > client.send_index:
+                first_new_item = max(0, client.send_index - len(start_inventory))
+                async_start(ctx.send_msgs(client, [{
+                    "cmd": "ReceivedItems",
+                    "index": client.send_index,
+                    "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+                client.send_index = len(start_inventory) + len(items)
 
 
 def update_checked_locations(ctx: Context, team: int, slot: int):
@@ -940,12 +1179,20 @@ def get_remaining(ctx: Context, team: int, slot: int) -> typing.List[int]:
     return ctx.locations.get_remaining(ctx.location_checks, team, slot)
 
 
+def add_received_items(ctx: Context, team: int, player: int, remote_items: bool, items: typing.List[NetworkItem]):
+    received_items = get_received_items(ctx, team, player, remote_items)
+    index = len(received_items)
+    received_items.extend(items)
+    ctx.journal_save("received_items", team, player, remote_items, index, items)
+    ctx.received_items_changed.add((team, player))
+
+
 def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem):
     for target in ctx.slot_set(target_slot):
-        for item in items:
-            if item.player != target_slot:
-                get_received_items(ctx, team, target, False).append(item)
-            get_received_items(ctx, team, target, True).append(item)
+        foreign_items = [item for item in items if item.player != target_slot]
+        if foreign_items:
+            add_received_items(ctx, team, target, False, foreign_items)
+        add_received_items(ctx, team, target, True, list(items))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -964,9 +1211,11 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
                 team + 1, ctx.player_names[(team, slot)], ctx.item_names[item_id],
                 ctx.player_names[(team, target_player)], ctx.location_names[location]))
             info_text = json_format_send_event(new_item, target_player)
-            ctx.broadcast_team(team, [info_text])
+            ctx.broadcast_team_batched(team, [info_text])
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.mark_hints_found(team, slot, new_locations)
+        ctx.journal_save("location_checks", team, slot, new_locations)
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1406,8 +1655,8 @@ class ClientMessageProcessor(CommonCommandProcessor):
             )
             if usable:
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
-                get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
-                get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                add_received_items(self.ctx, self.client.team, self.client.slot, False, [new_item])
+                add_received_items(self.ctx, self.client.team, self.client.slot, True, [new_item])
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1426,9 +1675,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         cost = self.ctx.get_hint_cost(self.client.slot)
 
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1629,7 +1876,8 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
         else:
             team, slot = ctx.connect_names[args['name']]
             if client.auth and client.team is not None and client.slot in ctx.clients[client.team]:
-                ctx.clients[team][slot].remove(client)  # re-auth, remove old entry
+                ctx.clients[client.team][client.slot].remove(client)  # re-auth, remove old entry
+                ctx.unindex_client(client)
                 if client.team != team or client.slot != slot:
                     client.auth = False  # swapping Team/Slot
             client.team = team
@@ -1639,6 +1887,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             ctx.clients[team][slot].append(client)
             client.version = args['version']
             client.tags = args['tags']
+            ctx.index_client(client)
             client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
             connected_packet = {
                 "cmd": "Connected",
@@ -1665,23 +1914,15 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
     elif cmd == "GetDataPackage":
         exclusions = args.get("exclusions", [])
         if "games" in args:
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name in set(args.get("games", []))}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": games}}])
+            requested_games = set(args.get("games", []))
+            games = [name for name in ctx.gamespackage if name in requested_games]
         # TODO: remove exclusions behaviour around 0.5.0
         elif exclusions:
             exclusions = set(exclusions)
-            games = {name: game_data for name, game_data in ctx.gamespackage.items()
-                     if name not in exclusions}
-
-            package = {"games": games}
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": package}])
-
+            games = [name for name in ctx.gamespackage if name not in exclusions]
         else:
-            await ctx.send_msgs(client, [{"cmd": "DataPackage",
-                                          "data": {"games": ctx.gamespackage}}])
+            games = list(ctx.gamespackage)
+        await ctx.send_encoded_msgs(client, ctx.encode_data_package(games))
 
     elif client.auth:
         if cmd == "ConnectUpdate":
@@ -1709,7 +1950,9 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
 
             if "tags" in args:
                 old_tags = client.tags
+                ctx.unindex_client(client)
                 client.tags = args["tags"]
+                ctx.index_client(client)
                 if set(old_tags) != set(client.tags):
                     client.no_locations = 'TextOnly' in client.tags or 'Tracker' in client.tags
                     ctx.broadcast_text_all(
@@ -1765,17 +2008,11 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             client.messageprocessor(args["text"])
 
         elif cmd == "Bounce":
-            games = set(args.get("games", []))
-            tags = set(args.get("tags", []))
-            slots = set(args.get("slots", []))
+            targets = ctx.bounce_targets(client.team, set(args.get("games", [])), set(args.get("tags", [])),
+                                         set(args.get("slots", [])))
             args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
-
-            for bounceclient in ctx.endpoints:
-                if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
-                                                         set(bounceclient.tags) & tags or
-                                                         bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+            if targets:
+                await ctx.broadcast_send_encoded_msgs(targets, ctx.dumper([args]))
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -1804,6 +2041,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 func = modify_functions[operation["operation"]]
                 value = func(value, operation["value"])
             ctx.stored_data[args["key"]] = args["value"] = value
+            ctx.journal_save("stored_data", args["key"], value)
             targets = set(ctx.stored_data_notification_clients[args["key"]])
             if args.get("want_reply", True):
                 targets.add(client)
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import typing
 import enum
+import itertools
 import warnings
 from json import JSONEncoder, JSONDecoder
 
@@ -101,7 +102,68 @@ _encode = JSONEncoder(
 ).encode
 
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_plain_json_types = frozenset((str, int, bool, type(None)))
+
+
+def _same_as_json_float(value: float) -> bool:
+    """orjson writes NaN and infinity as null and small floats without exponent, unlike json."""
+    return value == 0 or 1e-4 <= abs(value) < float("inf")
+
+
+def _orjson_compatible(values: typing.Collection[typing.Any], in_named_tuple: bool = False) -> bool:
+    """
+    Checks whether orjson will write values exactly like _encode(_scan_for_TypedTuples(values)).
+    Looks at types of whole collections at once, so only containers cost time in python.
+    """
+    element_types = set(map(type, values))
+    for element_type in element_types:
+        if element_type in _plain_json_types:
+            continue
+        elements = values if len(element_types) == 1 else [value for value in values if type(value) is element_type]
+        if element_type is float:
+            if not all(map(_same_as_json_float, elements)):
+                return False
+        elif issubclass(element_type, tuple) and hasattr(element_type, "_fields"):
+            # _scan_for_TypedTuples does not look inside NamedTuples, so json writes a nested one as a list
+            if in_named_tuple or not _orjson_compatible(list(itertools.chain.from_iterable(elements)), True):
+                return False
+        elif issubclass(element_type, dict):
+            if not all(key_type is str or issubclass(key_type, int) and key_type is not bool
+                       for key_type in set(map(type, itertools.chain.from_iterable(elements)))):
+                return False
+            if not _orjson_compatible(list(itertools.chain.from_iterable(value.values() for value in elements)),
+                                      in_named_tuple):
+                return False
+        elif issubclass(element_type, (list, tuple)) or \
+                issubclass(element_type, (set, frozenset)) and not in_named_tuple:
+            if not _orjson_compatible(list(itertools.chain.from_iterable(elements)), in_named_tuple):
+                return False
+        elif not issubclass(element_type, (str, int)):  # subclasses of these are written like their base
+            return False
+    return True
+
+
+def _orjson_default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
+        data = obj._asdict()
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
 def encode(obj: typing.Any) -> str:
+    if orjson and _orjson_compatible((obj,)):
+        try:
+            return orjson.dumps(obj, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:  # orjson.JSONEncodeError, for example on big integers, retry to get json's result
+            pass
     return _encode(_scan_for_TypedTuples(obj))
 
 
@@ -347,7 +409,11 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
-    def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _receiver_index: typing.Optional[typing.Dict[int, typing.Dict[int, typing.List[typing.Tuple[int, int, int, int]]]]]
+    """receiver -> item -> [(position, sender, location, flags)], position being the order in the store"""
+
+    def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]],
+                 build_indexes: bool = True):
         super().__init__(values)
 
         if not self:
@@ -359,8 +425,26 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        self._receiver_index = None
+        if build_indexes:
+            self._receiver_index = {}
+            position = 0
+            for sender, check_data in self.items():
+                for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                    self._receiver_index.setdefault(receiving_player, {}).setdefault(item_id, []).append(
+                        (position, sender, location_id, item_flags))
+                    position += 1
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+        if self._receiver_index is not None:
+            found = [(entry, receiving_player) for receiving_player in slots
+                     for entry in self._receiver_index.get(receiving_player, {}).get(seeked_item_id, ())]
+            if len(slots) > 1:
+                found.sort()
+            for (_, finding_player, location_id, item_flags), receiving_player in found:
+                yield finding_player, location_id, seeked_item_id, receiving_player, item_flags
+            return
         for finding_player, check_data in self.items():
             for location_id, (item_id, receiving_player, item_flags) in check_data.items():
                 if receiving_player in slots and item_id == seeked_item_id:
@@ -369,6 +453,11 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
+        if self._receiver_index is not None:
+            found = sorted(entry for entries in self._receiver_index.get(slot, {}).values() for entry in entries)
+            for _, source_slot, location_id, _ in found:
+                all_locations[source_slot].add(location_id)
+            return all_locations
         for source_slot, location_data in self.items():
             for location_id, values in location_data.items():
                 if values[1] == slot:
@@ -12,9 +12,11 @@ import pickle
 import functools
 import io
 import collections
+import contextvars
 import importlib
 import logging
 import warnings
+import zlib
 
 from argparse import Namespace
 from settings import Settings, get_settings
@@ -440,6 +442,171 @@ def restricted_loads(s):
     return RestrictedUnpickler(io.BytesIO(s)).load()
 
 
+multidata_format_version = 4
+"""version byte at the start of .archipelago files.
+up to 3: zlib compressed pickle. 4: followed by a codec byte (0: zlib), then the compressed pickle."""
+
+
+class _CompressingWriter:
+    """File-like object for pickle.Pickler, compressing each written frame straight into file."""
+    def __init__(self, file: BinaryIO, compression_level: int):
+        self.file = file
+        self.compressor = zlib.compressobj(compression_level)
+
+    def write(self, data: bytes) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def flush(self) -> None:
+        self.file.write(self.compressor.flush())
+
+
+def dump_multidata(multidata: Dict[str, Any], file: BinaryIO, compression_level: int = 9) -> None:
+    """Writes multidata as .archipelago to file, without holding the whole pickle or compressed blob in memory."""
+    file.write(bytes((multidata_format_version, 0)))
+    writer = _CompressingWriter(file, compression_level)
+    pickle.Pickler(writer).dump(multidata)
+    writer.flush()
+
+
+def load_multidata(data: bytes) -> Dict[str, Any]:
+    """Reads an .archipelago file's content, as written by dump_multidata or in format 3."""
+    format_version = data[0]
+    if format_version <= 3:
+        return restricted_loads(zlib.decompress(data[1:]))
+    if format_version == 4 and data[1] == 0:
+        return restricted_loads(zlib.decompress(data[2:]))
+    raise VersionException("Incompatible multidata.")
+
+
+save_sections_magic = b"APSAVE\x00\x01"
+"""start of saves written by dump_save_sections. Followed by the 4 byte little endian length of a pickled header,
+which maps section names to the lengths of their pickles, the header, then the pickles in header order."""
+
+
+def dump_save_sections(sections: Dict[str, bytes]) -> bytes:
+    """Joins separately pickled parts of a save, so they can be unpickled one at a time through SaveSections."""
+    header = pickle.dumps({name: len(data) for name, data in sections.items()})
+    return b"".join((save_sections_magic, len(header).to_bytes(4, "little"), header, *sections.values()))
+
+
+class SaveSections(typing.Mapping[str, Any]):
+    """Read-only mapping of a save written by dump_save_sections, each section is unpickled on first access.
+    Also reads plain pickled saves, which are unpickled as a whole right away, and empty data as an empty save."""
+    _sections: Dict[str, memoryview]
+    _loaded: Dict[str, Any]
+
+    def __init__(self, data: bytes):
+        self._sections = {}
+        if not data.startswith(save_sections_magic):
+            self._loaded = restricted_loads(data) if data else {}
+            return
+        self._loaded = {}
+        data = memoryview(data)
+        header_start = len(save_sections_magic) + 4
+        header_end = header_start + int.from_bytes(data[len(save_sections_magic):header_start], "little")
+        start = header_end
+        for name, size in restricted_loads(data[header_start:header_end]).items():
+            self._sections[name] = data[start:start + size]
+            start += size
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return self._loaded[key]
+        except KeyError:
+            value = self._loaded[key] = restricted_loads(self._sections[key])
+            return value
+
+    def __iter__(self) -> typing.Iterator[str]:
+        return iter(self._sections or self._loaded)
+
+    def __len__(self) -> int:
+        return len(self._sections or self._loaded)
+
+    def get_section_data(self, key: str) -> Optional[memoryview]:
+        """The pickled data of a section, None if the section does not exist or this is a plain pickled save."""
+        return self._sections.get(key)
+
+
+class GenerationProfiler:
+    """
+    Records wall time and memory allocated by generation steps, enabled by Generate.py --profile.
+    Allocations are traced process wide, so steps running at the same time in other threads,
+    like generate_output, count towards each other.
+    """
+    steps: typing.List[Dict[str, Any]]
+
+    def __init__(self) -> None:
+        import threading
+        import tracemalloc
+        self.steps = []
+        self._lock = threading.Lock()
+        self._tracemalloc = tracemalloc
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self, category: str, name: str, player: Optional[int] = None) -> Dict[str, Any]:
+        """Begins measuring a step, pass the returned step to stop."""
+        import time
+        return {"category": category, "name": name, "player": player,
+                "start": time.perf_counter(), "memory": self._tracemalloc.get_traced_memory()[0]}
+
+    def stop(self, step: Dict[str, Any]) -> None:
+        import time
+        step["seconds"] = time.perf_counter() - step.pop("start")
+        step["net_allocated_bytes"] = self._tracemalloc.get_traced_memory()[0] - step.pop("memory")
+        with self._lock:
+            self.steps.append(step)
+
+    def measure(self, category: str, name: str, player: Optional[int] = None) -> typing.ContextManager[None]:
+        """Context manager measuring its body as a step."""
+        import contextlib
+
+        @contextlib.contextmanager
+        def measuring() -> typing.Iterator[None]:
+            step = self.start(category, name, player)
+            try:
+                yield
+            finally:
+                self.stop(step)
+
+        return measuring()
+
+    def write(self, file_path: str) -> None:
+        """Writes all steps, slowest first, and totals per category and per player as JSON."""
+        steps = sorted(self.steps, key=lambda step: step["seconds"], reverse=True)
+        categories: Dict[str, float] = collections.defaultdict(float)
+        players: Dict[int, float] = collections.defaultdict(float)
+        for step in steps:
+            categories[step["category"]] += step["seconds"]
+            if step["player"] is not None:
+                players[step["player"]] += step["seconds"]
+        with open(file_path, "w") as f:
+            json.dump({"steps": steps, "seconds_per_category": categories, "seconds_per_player": players}, f,
+                      indent=1)
+
+
+def profile_step(profiler: Optional[GenerationProfiler], category: str, name: str,
+                 player: Optional[int] = None) -> typing.ContextManager[None]:
+    """profiler.measure if profiling is enabled, otherwise a context manager that does nothing."""
+    if profiler:
+        return profiler.measure(category, name, player)
+    import contextlib
+    return contextlib.nullcontext()
+
+
+generation_progress_hook: "contextvars.ContextVar[Optional[typing.Callable[[str, int, int], None]]]" = \
+    contextvars.ContextVar("generation_progress_hook", default=None)
+"""Optional callable receiving the generation progress as (step name, done, total). May raise to abort generation."""
+
+
+def report_generation_progress(step: str, done: int, total: int) -> None:
+    """Passes the progress of the current generation step to generation_progress_hook, if one is set."""
+    hook = generation_progress_hook.get()
+    if hook:
+        hook(step, done, total)
+
+
 class ByValue:
     """
     Mixin for enums to pickle value instead of name (restores pre-3.11 behavior). Use as left-most parent.
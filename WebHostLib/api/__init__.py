@@ -56,4 +56,4 @@ def get_datapackage_checksums():
     return version_package
 
 
-from . import generate, user  # trigger registration
+from . import generate, tracker, user  # trigger registration
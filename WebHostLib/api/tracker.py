@@ -0,0 +1,83 @@
+from typing import Any, Dict, Optional, Set, Tuple
+from uuid import UUID
+
+from flask import abort, jsonify, request
+
+from NetUtils import Hint
+from WebHostLib import app
+from WebHostLib.models import Room
+from WebHostLib.tracker import SaveChanges, TeamPlayer, TrackerData
+from . import api_endpoints
+
+
+def get_hint_data(team: int, hint: Hint) -> Dict[str, Any]:
+    return {"team": team, **hint._asdict()}
+
+
+def get_tracker_data(tracker_data: TrackerData) -> Dict[str, Any]:
+    players = []
+    for team, team_players in tracker_data.get_all_players().items():
+        for player in team_players:
+            slot_info = tracker_data.get_slot_info(team, player)
+            players.append({
+                "team": team,
+                "player": player,
+                "name": slot_info.name,
+                "alias": tracker_data.get_player_alias(team, player),
+                "game": slot_info.game,
+                "status": tracker_data.get_player_client_status(team, player),
+                "total_locations": len(tracker_data.get_player_locations(team, player)),
+                "checked_locations": sorted(tracker_data.get_player_checked_locations(team, player)),
+                "received_items": tracker_data.get_player_received_items(team, player),
+            })
+    return {
+        "version": tracker_data.get_room_save_version(),
+        "seed_name": tracker_data.get_seed_name(),
+        "players": players,
+        "hints": [get_hint_data(team, hint)
+                  for team, hints in tracker_data.get_team_hints().items() for hint in hints],
+    }
+
+
+def get_tracker_changes(changes: SaveChanges) -> Dict[str, Any]:
+    players: Dict[TeamPlayer, Dict[str, Any]] = {}
+    for (team, player), status in changes.client_statuses.items():
+        players.setdefault((team, player), {"team": team, "player": player})["status"] = status
+    for (team, player), locations in changes.checked_locations.items():
+        players.setdefault((team, player), {"team": team, "player": player})["checked_locations"] = sorted(locations)
+    for (team, player), items in changes.received_items.items():
+        players.setdefault((team, player), {"team": team, "player": player})["received_items"] = items
+    # hints show up for both involved slots
+    hints: Set[Tuple[int, Hint]] = {(team, hint) for (team, _), player_hints in changes.hints.items()
+                                    for hint in player_hints}
+    return {
+        "version": changes.version,
+        "since": changes.since_version,
+        "players": [players[team_player] for team_player in sorted(players)],
+        "hints": [get_hint_data(team, hint) for team, hint in hints],
+    }
+
+
+@api_endpoints.route('/tracker/<suuid:tracker>')
+def tracker_api(tracker: UUID):
+    """Tracker data of a room as JSON. The response is tagged with the room's save version, which can be sent back
+    with If-None-Match to get a 304 while the room did not save, or as the "since" argument to only get what changed
+    since that version: newly checked locations, newly received items, changed client statuses and new or found hints.
+    If the changes since that version are not known, the full tracker data is sent instead."""
+    room = Room.get(tracker=tracker)
+    if not room:
+        return abort(404)
+
+    tracker_data = TrackerData(room)
+    tracker_data.record_room_save_changes()
+    version = tracker_data.get_room_save_version()
+    since: Optional[str] = request.args.get("since")
+    changes = tracker_data.get_room_save_changes(since) if since and since != version else None
+    if request.if_none_match.contains(version) or since == version:
+        response = app.response_class(status=304)
+    elif changes:
+        response = jsonify(get_tracker_changes(changes))
+    else:
+        response = jsonify(get_tracker_data(tracker_data))
+    response.set_etag(version)
+    return response
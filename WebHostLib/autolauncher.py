@@ -1,12 +1,16 @@
 from __future__ import annotations
 
+import collections
+import functools
 import json
 import logging
 import multiprocessing
+import queue
 import threading
 import time
 import typing
 from datetime import timedelta, datetime
+from uuid import UUID
 
 from pony.orm import db_session, select, commit
 
@@ -19,7 +23,10 @@ def launch_room(room: Room, config: dict):
     if room.last_activity >= datetime.utcnow() - timedelta(seconds=room.timeout):
         multiworld = multiworlds.get(room.id, None)
         if not multiworld:
-            multiworld = MultiworldInstance(room, config)
+            if config["ROOM_WORKERS"]:
+                multiworld = SharedMultiworldInstance(room, config)
+            else:
+                multiworld = MultiworldInstance(room, config)
 
         multiworld.start()
 
@@ -35,22 +42,95 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation):
+def wait_for_generator(result: multiprocessing.pool.AsyncResult,
+                       done: typing.Optional[typing.Callable[[], None]] = None):
+    """Waits for a generation started by launch_generator. gen_game only returns once its generation thread exited,
+    so done is called when the pool process is free to take the next generation."""
+    try:
+        handle_generation_success(result.get())
+    except BaseException as e:
+        handle_generation_failure(e)
+    finally:
+        if done:
+            done()
+
+
+def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation,
+                     done: typing.Optional[typing.Callable[[], None]] = None):
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
-        pool.apply_async(gen_game, (options,),
-                         {"meta": meta,
-                          "sid": generation.id,
-                          "owner": generation.owner},
-                         handle_generation_success, handle_generation_failure)
+        result = pool.apply_async(gen_game, (options,),
+                                  {"meta": meta,
+                                   "sid": generation.id,
+                                   "owner": generation.owner})
     except Exception as e:
         generation.state = STATE_ERROR
         commit()
         logging.exception(e)
+        if done:
+            done()
     else:
         generation.state = STATE_STARTED
+        threading.Thread(target=wait_for_generator, args=(result, done),
+                         name=f"AP_Generation_{generation.id}", daemon=True).start()
+
+
+class QueuedGeneration(typing.NamedTuple):
+    owner: UUID
+    players: int
+    queued: float
+    """time.monotonic() of when the queue first saw the generation"""
+
+
+class GenerationQueue:
+    """Decides which queued generations to start next, running at most `slots` of them at once.
+    Owners with fewer generations running go first, then generations with fewer players, then those queued earlier.
+    Once a generation has waited `max_wait` seconds, it is no longer overtaken by smaller ones."""
+
+    def __init__(self, slots: int, max_wait: float):
+        self.slots = slots
+        self.max_wait = max_wait
+        self.queued: typing.Dict[UUID, QueuedGeneration] = {}
+        self.running: typing.Dict[UUID, UUID] = {}  # generation id -> owner
+        self.lock = threading.Lock()
+
+    def __contains__(self, generation_id: UUID) -> bool:
+        with self.lock:
+            return generation_id in self.queued or generation_id in self.running
+
+    def add(self, generation_id: UUID, owner: UUID, players: int):
+        with self.lock:
+            self.queued.setdefault(generation_id, QueuedGeneration(owner, players, time.monotonic()))
+
+    def retain(self, generation_ids: typing.Collection[UUID]):
+        """Forgets queued generations that are not in generation_ids anymore."""
+        with self.lock:
+            for generation_id in self.queued.keys() - set(generation_ids):
+                del self.queued[generation_id]
+
+    def take(self) -> typing.Optional[UUID]:
+        """Returns the generation to start next and counts it as running, if there is a free slot for it."""
+        with self.lock:
+            if not self.queued or len(self.running) >= self.slots:
+                return None
+            running_per_owner = collections.Counter(self.running.values())
+            now = time.monotonic()
+
+            def priority(item: typing.Tuple[UUID, QueuedGeneration]):
+                queued = item[1]
+                overdue = now - queued.queued >= self.max_wait
+                return running_per_owner[queued.owner], not overdue, 0 if overdue else queued.players, queued.queued
+
+            generation_id, queued = min(self.queued.items(), key=priority)
+            del self.queued[generation_id]
+            self.running[generation_id] = queued.owner
+            return generation_id
+
+    def finish(self, generation_id: UUID):
+        with self.lock:
+            self.running.pop(generation_id, None)
 
 
 def init_db(pony_config: dict):
@@ -84,6 +164,7 @@ def autogen(config: dict):
         try:
             with Locker("autogen"):
 
+                generation_queue = GenerationQueue(config["GENERATORS"], config["JOB_TIME"])
                 with multiprocessing.Pool(config["GENERATORS"], initializer=init_db,
                                           initargs=(config["PONY"],), maxtasksperchild=10) as generator_pool:
                     with db_session:
@@ -96,7 +177,7 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation)
+                                    generation.state = STATE_QUEUED
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
@@ -105,11 +186,25 @@ def autogen(config: dict):
                         time.sleep(0.1)
                         with db_session:
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
-                                generation for generation in Generation
-                                if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation)
+                            queued = select(
+                                (generation.id, generation.owner) for generation in Generation
+                                if generation.state == STATE_QUEUED).for_update()[:]
+                            generation_queue.retain([generation_id for generation_id, owner in queued])
+                            for generation_id, owner in queued:
+                                if generation_id not in generation_queue:
+                                    try:
+                                        players = len(restricted_loads(Generation[generation_id].options))
+                                    except Exception as e:
+                                        players = 0  # fails again when launched, which reports the error
+                                        logging.exception(e)
+                                    generation_queue.add(generation_id, owner, players)
+
+                            while True:
+                                generation_id = generation_queue.take()
+                                if generation_id is None:
+                                    break
+                                launch_generator(generator_pool, Generation[generation_id],
+                                                 functools.partial(generation_queue.finish, generation_id))
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -157,6 +252,95 @@ class MultiworldInstance():
         self.process = None
 
 
+class RoomWorker:
+    """A process hosting many rooms on one event loop, see customserver.run_room_worker."""
+
+    def __init__(self, worker_id: int, config: dict):
+        self.worker_id = worker_id
+        self.rooms: typing.Set[type(Room.id)] = set()  # as far as this process knows
+        self.process: typing.Optional[multiprocessing.Process] = None
+        self.room_queue: typing.Optional[multiprocessing.Queue] = None
+        self.stopped_queue: typing.Optional[multiprocessing.Queue] = None
+        self.lock = threading.Lock()
+        self.ponyconfig = config["PONY"]
+        self.cert = config["SELFLAUNCHCERT"]
+        self.key = config["SELFLAUNCHKEY"]
+        self.host = config["HOST_ADDRESS"]
+
+    def _update(self):
+        if not self.process or not self.process.is_alive():
+            self.rooms.clear()
+            return
+        while True:
+            try:
+                self.rooms.discard(self.stopped_queue.get_nowait())
+            except queue.Empty:
+                break
+
+    def load(self) -> int:
+        with self.lock:
+            self._update()
+            return len(self.rooms)
+
+    def hosts(self, room_id) -> bool:
+        with self.lock:
+            self._update()
+            return room_id in self.rooms
+
+    def host(self, room_id):
+        with self.lock:
+            self._update()
+            if not self.process or not self.process.is_alive():
+                logging.info(f"Spinning up room worker {self.worker_id}")
+                self.room_queue = multiprocessing.Queue()
+                self.stopped_queue = multiprocessing.Queue()
+                self.process = multiprocessing.Process(group=None, target=run_room_worker,
+                                                       args=(self.worker_id, self.room_queue, self.stopped_queue,
+                                                             self.ponyconfig, get_static_server_data(),
+                                                             self.cert, self.key, self.host),
+                                                       name=f"MultiHostWorker{self.worker_id}")
+                self.process.start()
+            self.rooms.add(room_id)
+            self.room_queue.put(room_id)
+
+
+room_workers: typing.List[RoomWorker] = []
+
+
+def get_room_worker(config: dict) -> RoomWorker:
+    """Returns the room worker hosting the fewest rooms, out of a pool of config["ROOM_WORKERS"] workers."""
+    with guardian_lock:
+        while len(room_workers) < config["ROOM_WORKERS"]:
+            room_workers.append(RoomWorker(len(room_workers), config))
+    return min(room_workers, key=RoomWorker.load)
+
+
+class SharedMultiworldInstance(MultiworldInstance):
+    """A room hosted by one of the room workers instead of a process of its own."""
+    worker: typing.Optional[RoomWorker] = None
+
+    def __init__(self, room: Room, config: dict):
+        super().__init__(room, config)
+        self.config = config
+
+    def start(self):
+        if self.worker and self.worker.hosts(self.room_id):
+            return False
+
+        logging.info(f"Spinning up {self.room_id}")
+        self.worker = get_room_worker(self.config)
+        self.worker.host(self.room_id)
+
+    def stop(self):
+        pass  # the room shuts down by itself, the worker keeps hosting the other rooms
+
+    def done(self):
+        return self.worker and not self.worker.hosts(self.room_id)
+
+    def collect(self):
+        self.worker = None
+
+
 guardian = None
 guardian_lock = threading.Lock()
 
@@ -192,5 +376,5 @@ def run_guardian():
 
 
 from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed
-from .customserver import run_server_process, get_static_server_data
+from .customserver import run_room_worker, run_server_process, get_static_server_data
 from .generate import gen_game
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import collections
+import contextvars
 import datetime
 import functools
 import logging
+import os
 import pickle
 import random
 import socket
@@ -19,8 +21,8 @@ from pony.orm import commit, db_session, select
 import Utils
 
 from MultiServer import Context, server, auto_shutdown, ServerCommandProcessor, ClientMessageProcessor, load_server_cert
-from Utils import restricted_loads, cache_argsless
-from .locker import Locker
+from Utils import cache_argsless
+from .locker import AlreadyRunningException, CommonLocker, Locker
 from .models import Command, GameDataPackage, Room, db
 
 
@@ -58,6 +60,16 @@ class DBCommandProcessor(ServerCommandProcessor):
 
 class WebHostContext(Context):
     room_id: int
+    # save sections that are only pickled again after a journaled change to them, by journal record kind
+    journaled_save_sections: typing.ClassVar[typing.Dict[str, typing.Tuple[str, ...]]] = {
+        "location_checks": ("location_checks", "hints"),  # checks also mark hints found
+        "received_items": ("received_items",),
+        "hint": ("hints",),
+        "stored_data": ("stored_data",),
+    }
+    save_sections: typing.Dict[str, bytes]
+    """pickled sections of the last save"""
+    dirty_save_sections: typing.Set[str]
 
     def __init__(self, static_server_data: dict):
         # static server data is used during _load_game_data to load required data,
@@ -68,25 +80,14 @@ class WebHostContext(Context):
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
         self.tags = ["AP", "WebHost"]
+        self.save_sections = {}
+        self.dirty_save_sections = set()
 
     def _load_game_data(self):
         for key, value in self.static_server_data.items():
             setattr(self, key, value)
         self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
 
-    def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            with db_session:
-                commands = select(command for command in Command if command.room.id == self.room_id)
-                if commands:
-                    for command in commands:
-                        self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                        command.delete()
-                    commit()
-            time.sleep(5)
-
     @db_session
     def load(self, room_id: int):
         self.room_id = room_id
@@ -118,14 +119,33 @@ class WebHostContext(Context):
         if self.saving:
             savegame_data = Room.get(id=self.room_id).multisave
             if savegame_data:
-                self.set_save(restricted_loads(Room.get(id=self.room_id).multisave))
+                self.set_save(Utils.SaveSections(savegame_data))
             self._start_async_saving()
-        threading.Thread(target=self.listen_to_db_commands, daemon=True).start()
+
+    def journal_save(self, *record):
+        super().journal_save(*record)
+        self.dirty_save_sections.update(self.journaled_save_sections[record[0]])
+
+    def dump_save(self, full: bool = False) -> bytes:
+        """Writes the save in sections, sections that can be journaled are only pickled again if they changed,
+        unless a full save is requested."""
+        with self.save_lock:
+            # drained instead of swapped, journal_save adds to the set from the event loop without holding the lock
+            dirty_sections = set()
+            while self.dirty_save_sections:
+                dirty_sections.add(self.dirty_save_sections.pop())
+            journaled_sections = {section for sections in self.journaled_save_sections.values()
+                                  for section in sections}
+            for section, value in self.get_save().items():
+                if full or section in dirty_sections or section not in journaled_sections \
+                        or section not in self.save_sections:
+                    self.save_sections[section] = pickle.dumps(value)
+            return Utils.dump_save_sections(self.save_sections)
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
-        room.multisave = pickle.dumps(self.get_save())
+        room.multisave = self.dump_save(exit_save)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = datetime.datetime.utcnow()
@@ -137,6 +157,149 @@ class WebHostContext(Context):
         return d
 
 
+# room that the running code belongs to, for processes hosting multiple rooms
+hosted_room: contextvars.ContextVar = contextvars.ContextVar("hosted_room", default=None)
+
+
+class RoomLogHandler(logging.Handler):
+    """Writes records to the log file of the room they were logged for, so rooms sharing a process keep their logs."""
+
+    def __init__(self):
+        super().__init__()
+        self.files: typing.Dict[typing.Any, logging.FileHandler] = {}
+
+    def add_room(self, room_id):
+        file_handler = logging.FileHandler(os.path.join(Utils.user_path("logs"), f"{room_id}.txt"), "a",
+                                           encoding="utf-8-sig")
+        file_handler.setFormatter(logging.Formatter("[%(name)s at %(asctime)s]: %(message)s"))
+        self.files[room_id] = file_handler
+
+    def remove_room(self, room_id):
+        file_handler = self.files.pop(room_id, None)
+        if file_handler:
+            file_handler.close()
+
+    def emit(self, record: logging.LogRecord):
+        file_handler = self.files.get(hosted_room.get())
+        if file_handler and not getattr(record, "NoFile", False):
+            file_handler.handle(record)
+
+
+async def room_server(websocket, path: str = "/", ctx: WebHostContext = None):
+    hosted_room.set(ctx.room_id)  # connections are not started from the context of their room
+    await server(websocket, path, ctx)
+
+
+def get_command_notification_file(room_id) -> str:
+    return os.path.join(CommonLocker.lock_folder, f"{room_id}.notify")
+
+
+def notify_room_command(room_id):
+    """Wakes the process hosting the room to pick up its new commands, if it runs on this machine.
+    Without this the command is picked up by the next poll."""
+    try:
+        with open(get_command_notification_file(room_id)) as f:
+            port = int(f.read())
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as notification_socket:
+            notification_socket.sendto(str(room_id).encode(), ("127.0.0.1", port))
+    except (OSError, ValueError):
+        pass
+
+
+class DBCommandListener:
+    """Hands commands queued in the database to the rooms hosted by this process.
+    The web process notifies it of new commands through a local socket, polling for all rooms at once remains
+    as fallback for commands that were queued from elsewhere."""
+    interval = 5  # seconds between polls without notifications
+    notified_interval = 30  # seconds between fallback polls if notifications can be received
+
+    def __init__(self):
+        self.rooms: typing.Dict[int, typing.Tuple[WebHostContext, DBCommandProcessor, contextvars.Context]] = {}
+        self.lock = threading.Lock()
+        self.thread: typing.Optional[threading.Thread] = None
+        self.notification_socket: typing.Optional[socket.socket] = None
+        try:
+            self.notification_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.notification_socket.bind(("127.0.0.1", 0))
+            self.notification_socket.settimeout(self.notified_interval)
+        except OSError as e:
+            logging.exception(e)
+            self.notification_socket = None
+
+    def add(self, ctx: WebHostContext):
+        with self.lock:
+            self.rooms[ctx.room_id] = ctx, DBCommandProcessor(ctx), contextvars.copy_context()
+            if self.notification_socket:
+                try:
+                    with open(get_command_notification_file(ctx.room_id), "w") as f:
+                        f.write(str(self.notification_socket.getsockname()[1]))
+                except OSError as e:
+                    logging.exception(e)
+            if not self.thread:
+                self.thread = threading.Thread(target=self.run, name="DBCommandListener", daemon=True)
+                self.thread.start()
+
+    def remove(self, ctx: WebHostContext):
+        with self.lock:
+            self.rooms.pop(ctx.room_id, None)
+            if self.notification_socket:
+                try:
+                    os.unlink(get_command_notification_file(ctx.room_id))
+                except OSError:
+                    pass
+
+    def wait(self) -> typing.Optional[typing.Set[str]]:
+        """Waits for notifications, returns the ids of the notified rooms,
+        or None if it is time to poll for all rooms."""
+        if not self.notification_socket:
+            time.sleep(self.interval)
+            return None
+        try:
+            notified = {self.notification_socket.recv(64).decode(errors="replace")}
+        except socket.timeout:
+            return None
+        self.notification_socket.setblocking(False)
+        try:
+            while True:  # collect notifications that arrived meanwhile
+                notified.add(self.notification_socket.recv(64).decode(errors="replace"))
+        except BlockingIOError:
+            pass
+        finally:
+            self.notification_socket.settimeout(self.notified_interval)
+        return notified
+
+    @db_session
+    def poll(self, notified: typing.Optional[typing.Set[str]] = None):
+        with self.lock:
+            rooms = dict(self.rooms)
+        if notified is not None:
+            rooms = {room_id: room for room_id, room in rooms.items() if str(room_id) in notified}
+        if not rooms:
+            return
+        room_ids = list(rooms)
+        commands = select(command for command in Command if command.room.id in room_ids)
+        if commands:
+            for command in commands:
+                ctx, cmdprocessor, context = rooms[command.room.id]
+                ctx.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext, context=context)
+                command.delete()
+            commit()
+
+    def run(self):
+        notified = None
+        last_full_poll = time.monotonic()
+        while True:
+            if notified is None:
+                last_full_poll = time.monotonic()
+            try:
+                self.poll(notified)
+            except Exception as e:
+                logging.exception(e)
+            notified = self.wait()
+            if notified is not None and time.monotonic() - last_full_poll > self.notified_interval:
+                notified = None  # frequent notifications should not hold back the fallback poll
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -159,32 +322,38 @@ def get_static_server_data() -> dict:
     return data
 
 
-def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
-                       cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str):
-    # establish DB connection for multidata and multisave
-    db.bind(**ponyconfig)
-    db.generate_mapping(check_tables=False)
-
-    async def main():
-        if "worlds" in sys.modules:
-            raise Exception("Worlds system should not be loaded in the custom server.")
-
-        import gc
-        Utils.init_logging(str(room_id), write_mode="a")
-        ctx = WebHostContext(static_server_data)
-        ctx.load(room_id)
-        ctx.init_save()
-        ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
-        gc.collect()  # free intermediate objects used during setup
+def set_room_stopped(room_id, errored: bool = False):
+    with db_session:
+        room = Room.get(id=room_id)
+        if errored:
+            room.last_port = -1
+        # ensure the Room does not spin up again on its own, minute of safety buffer
+        room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+
+
+async def host_room(room_id, static_server_data: dict, ssl_context: typing.Optional["ssl.SSLContext"], host: str,
+                    command_listener: DBCommandListener):
+    """Hosts the room until it shuts down, other rooms may be hosted on the same event loop meanwhile."""
+    import gc
+    ctx = WebHostContext(static_server_data)
+    # loading reads the database and decompresses multidata and save, so it runs off the event loop,
+    # keeping the other rooms hosted on it responsive. The context is copied to keep logging to this room's file.
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, contextvars.copy_context().run, ctx.load, room_id)
+    await loop.run_in_executor(None, contextvars.copy_context().run, ctx.init_save)
+    command_listener.add(ctx)
+    gc.collect()  # free intermediate objects used during setup
+    listening = False
+    try:
         try:
-            ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, ctx.port, ssl=ssl_context)
+            ctx.server = websockets.serve(functools.partial(room_server, ctx=ctx), ctx.host, ctx.port, ssl=ssl_context)
 
             await ctx.server
         except OSError:  # likely port in use
-            ctx.server = websockets.serve(functools.partial(server, ctx=ctx), ctx.host, 0, ssl=ssl_context)
+            ctx.server = websockets.serve(functools.partial(room_server, ctx=ctx), ctx.host, 0, ssl=ssl_context)
 
             await ctx.server
+        listening = True
         port = 0
         for wssocket in ctx.server.ws_server.sockets:
             socketname = wssocket.getsockname()
@@ -195,7 +364,7 @@ def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
             elif wssocket.family == socket.AF_INET:
                 port = socketname[1]
         if port:
-            logging.info(f'Hosting game at {host}:{port}')
+            logging.info(f'Hosting game {room_id} at {host}:{port}')
             with db_session:
                 room = Room.get(id=ctx.room_id)
                 room.last_port = port
@@ -207,24 +376,92 @@ def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
         await ctx.shutdown_task
 
         # ensure auto launch is on the same page in regard to room activity.
-        with db_session:
-            room: Room = Room.get(id=ctx.room_id)
-            room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(seconds=room.timeout + 60)
+        set_room_stopped(room_id)
+
+        logging.info(f"Shutting down {room_id}")
+    finally:
+        command_listener.remove(ctx)
+        if not ctx.exit_event.is_set():  # stopped by an error instead of auto_shutdown
+            ctx.exit_event.set()
+            if listening:
+                ctx.server.ws_server.close()
+        if ctx.saving:
+            # save now instead of at exit, the process may keep hosting other rooms for a long time
+            import atexit
+            atexit.unregister(ctx._save)
+            ctx._save(True)
+
+
+def run_server_process(room_id, ponyconfig: dict, static_server_data: dict,
+                       cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
+                       host: str):
+    # establish DB connection for multidata and multisave
+    db.bind(**ponyconfig)
+    db.generate_mapping(check_tables=False)
+
+    async def main():
+        if "worlds" in sys.modules:
+            raise Exception("Worlds system should not be loaded in the custom server.")
 
-        logging.info("Shutting down")
+        Utils.init_logging(str(room_id), write_mode="a")
+        ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
+        await host_room(room_id, static_server_data, ssl_context, host, DBCommandListener())
 
     with Locker(room_id):
         try:
             asyncio.run(main())
         except (KeyboardInterrupt, SystemExit):
-            with db_session:
-                room = Room.get(id=room_id)
-                # ensure the Room does not spin up again on its own, minute of safety buffer
-                room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+            set_room_stopped(room_id)
         except Exception:
-            with db_session:
-                room = Room.get(id=room_id)
-                room.last_port = -1
-                # ensure the Room does not spin up again on its own, minute of safety buffer
-                room.last_activity = datetime.datetime.utcnow() - datetime.timedelta(minutes=1, seconds=room.timeout)
+            set_room_stopped(room_id, errored=True)
+            raise
+
+
+def run_room_worker(worker_id: int, room_queue: "multiprocessing.Queue", stopped_queue: "multiprocessing.Queue",
+                    ponyconfig: dict, static_server_data: dict,
+                    cert_file: typing.Optional[str], cert_key_file: typing.Optional[str], host: str):
+    """Hosts every room whose id arrives through room_queue on one event loop,
+    and puts the ids of rooms that stopped into stopped_queue."""
+    db.bind(**ponyconfig)
+    db.generate_mapping(check_tables=False)
+
+    room_log = RoomLogHandler()
+
+    async def run_room(room_id, ssl_context, command_listener: DBCommandListener):
+        hosted_room.set(room_id)
+        try:
+            with Locker(room_id):
+                room_log.add_room(room_id)
+                await host_room(room_id, static_server_data, ssl_context, host, command_listener)
+        except AlreadyRunningException:
+            logging.info(f"Room {room_id} is already running elsewhere.")
+        except asyncio.CancelledError:
+            set_room_stopped(room_id)
             raise
+        except Exception as e:
+            logging.exception(e)
+            set_room_stopped(room_id, errored=True)
+        finally:
+            room_log.remove_room(room_id)
+            stopped_queue.put(room_id)
+
+    async def main():
+        if "worlds" in sys.modules:
+            raise Exception("Worlds system should not be loaded in the custom server.")
+
+        Utils.init_logging(f"RoomWorker{worker_id}", write_mode="a")
+        logging.getLogger().addHandler(room_log)
+        ssl_context = load_server_cert(cert_file, cert_key_file) if cert_file else None
+        command_listener = DBCommandListener()
+        rooms: typing.Dict[typing.Any, asyncio.Task] = {}
+        loop = asyncio.get_running_loop()
+        while True:
+            room_id = await loop.run_in_executor(None, room_queue.get)
+            if room_id not in rooms:
+                rooms[room_id] = asyncio.create_task(run_room(room_id, ssl_context, command_listener))
+                rooms[room_id].add_done_callback(lambda task, stopped_room=room_id: rooms.pop(stopped_room))
+
+    try:
+        asyncio.run(main())
+    except (KeyboardInterrupt, SystemExit):
+        pass
@@ -1,4 +1,3 @@
-import json
 import zipfile
 from io import BytesIO
 
@@ -8,6 +7,7 @@ from pony.orm import select
 from worlds.Files import AutoPatchRegister
 from . import app, cache
 from .models import Slot, Room, Seed
+from .patches import get_patch, get_patch_manifest, is_split_patch, iter_patch
 
 
 @app.route("/dl_patch/<suuid:room_id>/<int:patch_id>")
@@ -18,29 +18,21 @@ def download_patch(room_id, patch_id):
     else:
         room = Room.get(id=room_id)
         last_port = room.last_port
-        filelike = BytesIO(patch.data)
-        greater_than_version_3 = zipfile.is_zipfile(filelike)
+        greater_than_version_3 = is_split_patch(patch.data) or zipfile.is_zipfile(BytesIO(patch.data))
         if greater_than_version_3:
-            # Python's zipfile module cannot overwrite/delete files in a zip, so we recreate the whole thing in ram
-            new_file = BytesIO()
-            with zipfile.ZipFile(filelike, "a") as zf:
-                with zf.open("archipelago.json", "r") as f:
-                    manifest = json.load(f)
-                manifest["server"] = f"{app.config['HOST_ADDRESS']}:{last_port}" if last_port else None
-                with zipfile.ZipFile(new_file, "w") as new_zip:
-                    for file in zf.infolist():
-                        if file.filename == "archipelago.json":
-                            new_zip.writestr("archipelago.json", json.dumps(manifest))
-                        else:
-                            new_zip.writestr(file.filename, zf.read(file), file.compress_type, 9)
+            # only the manifest is written anew, the other members are sent as they were stored
+            manifest = get_patch_manifest(patch)
+            manifest["server"] = f"{app.config['HOST_ADDRESS']}:{last_port}" if last_port else None
+            size, parts = iter_patch(patch, manifest)
             if "patch_file_ending" in manifest:
                 patch_file_ending = manifest["patch_file_ending"]
             else:
                 patch_file_ending = AutoPatchRegister.patch_types[patch.game].patch_file_ending
             fname = f"P{patch.player_id}_{patch.player_name}_{app.jinja_env.filters['suuid'](room_id)}" \
                     f"{patch_file_ending}"
-            new_file.seek(0)
-            return send_file(new_file, as_attachment=True, download_name=fname)
+            return Response(parts, mimetype="application/octet-stream",
+                            headers={"Content-Disposition": f"attachment; filename=\"{fname}\"",
+                                     "Content-Length": str(size)})
         else:
             return "Old Patch file, no longer compatible."
 
@@ -61,18 +53,19 @@ def download_slot_file(room_id, player_id: int):
     else:
         import io
 
+        data = get_patch(slot_data)
         if slot_data.game == "Minecraft":
             from worlds.minecraft import mc_update_output
             fname = f"AP_{app.jinja_env.filters['suuid'](room_id)}_P{slot_data.player_id}_{slot_data.player_name}.apmc"
-            data = mc_update_output(slot_data.data, server=app.config['HOST_ADDRESS'], port=room.last_port)
+            data = mc_update_output(data, server=app.config['HOST_ADDRESS'], port=room.last_port)
             return send_file(io.BytesIO(data), as_attachment=True, download_name=fname)
         elif slot_data.game == "Factorio":
-            with zipfile.ZipFile(io.BytesIO(slot_data.data)) as zf:
+            with zipfile.ZipFile(io.BytesIO(data)) as zf:
                 for name in zf.namelist():
                     if name.endswith("info.json"):
                         fname = name.rsplit("/", 1)[0] + ".zip"
         elif slot_data.game == "Ocarina of Time":
-            stream = io.BytesIO(slot_data.data)
+            stream = io.BytesIO(data)
             if zipfile.is_zipfile(stream):
                 with zipfile.ZipFile(stream) as zf:
                     for name in zf.namelist():
@@ -94,7 +87,7 @@ def download_slot_file(room_id, player_id: int):
             fname = f"AP+{app.jinja_env.filters['suuid'](room_id)}_P{slot_data.player_id}_{slot_data.player_name}.apmq"
         else:
             return "Game download not supported."
-        return send_file(io.BytesIO(slot_data.data), as_attachment=True, download_name=fname)
+        return send_file(io.BytesIO(data), as_attachment=True, download_name=fname)
 
 
 @app.route("/templates")
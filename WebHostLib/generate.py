@@ -4,21 +4,24 @@ import os
 import pickle
 import random
 import tempfile
+import threading
+import time
 import zipfile
 from collections import Counter
 from typing import Any, Dict, List, Optional, Union
 
 from flask import flash, redirect, render_template, request, session, url_for
 from pony.orm import commit, db_session
+from pony.orm.core import OptimisticCheckError
 
 from BaseClasses import get_seed, seeddigits
 from Generate import PlandoOptions, handle_name
 from Main import main as ERmain
-from Utils import __version__
+from Utils import __version__, generation_progress_hook
 from WebHostLib import app
 from worlds.alttp.EntranceRandomizer import parse_arguments
 from .check import get_yaml_data, roll_options
-from .models import Generation, STATE_ERROR, STATE_QUEUED, Seed, UUID
+from .models import Generation, STATE_ERROR, STATE_QUEUED, STATE_STARTED, Seed, UUID
 from .upload import upload_zip_to_db
 
 
@@ -101,14 +104,55 @@ def generate(race=False):
     return render_template("generate.html", race=race, version=__version__)
 
 
+class GenerationCancelled(Exception):
+    pass
+
+
+class GenerationProgress:
+    """Reports the progress of a generation into the meta of its Generation row, if it has one,
+    and stops the generation at its next progress report once cancelled."""
+    report_interval = 1.0  # seconds between writes to the Generation row
+
+    def __init__(self, sid: Optional[UUID]):
+        self.sid = sid
+        self.cancelled = threading.Event()
+        self.last_report = 0.0
+
+    def cancel(self) -> None:
+        self.cancelled.set()
+
+    def check(self) -> None:
+        if self.cancelled.is_set():
+            raise GenerationCancelled("Generation was cancelled.")
+
+    def step_progress(self, step: str, done: int, total: int) -> None:
+        self.check()
+        if self.sid and time.monotonic() - self.last_report >= self.report_interval:
+            self.last_report = time.monotonic()
+            self.report({"step": step, "done": done, "total": total})
+
+    def report(self, progress: Dict[str, Any]) -> None:
+        try:
+            with db_session:
+                gen = Generation.get(id=self.sid)
+                if gen is not None and gen.state == STATE_STARTED:
+                    meta = json.loads(gen.meta)
+                    meta["progress"] = progress
+                    gen.meta = json.dumps(meta)
+        except OptimisticCheckError:
+            pass  # the Generation row changed concurrently, e.g. because it errored
+
+
 def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=None, sid=None):
     if not meta:
         meta: Dict[str, Any] = {}
 
     meta.setdefault("server_options", {}).setdefault("hint_cost", 10)
     race = meta.setdefault("generator_options", {}).setdefault("race", False)
+    progress = GenerationProgress(sid)
 
     def task():
+        generation_progress_hook.set(progress.step_progress)
         target = tempfile.TemporaryDirectory()
         playercount = len(gen_options)
         seed = get_seed()
@@ -148,14 +192,17 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
         if len(set(erargs.name.values())) != len(erargs.name):
             raise Exception(f"Names have to be unique. Names: {Counter(erargs.name.values())}")
         ERmain(erargs, seed, baked_server_options=meta["server_options"])
+        progress.check()
 
         return upload_to_db(target.name, sid, owner, race)
     thread_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1)
     thread = thread_pool.submit(task)
+    thread_pool.shutdown(wait=False)
 
     try:
         return thread.result(app.config["JOB_TIME"])
     except concurrent.futures.TimeoutError as e:
+        progress.cancel()  # the thread stops at its next progress report
         if sid:
             with db_session:
                 gen = Generation.get(id=sid)
@@ -167,6 +214,8 @@ def gen_game(gen_options: dict, meta: Optional[Dict[str, Any]] = None, owner=Non
                             e.__class__.__name__ + ": " + str(e))
                     gen.meta = json.dumps(meta)
                     commit()
+        # keep this process busy, and so its generator slot taken, until the thread actually stopped
+        concurrent.futures.wait([thread])
     except BaseException as e:
         if sid:
             with db_session:
@@ -192,7 +241,8 @@ def wait_seed(seed: UUID):
         return "Generation not found."
     elif generation.state == STATE_ERROR:
         return render_template("seedError.html", seed_error=generation.meta)
-    return render_template("waitSeed.html", seed_id=seed_id)
+    return render_template("waitSeed.html", seed_id=seed_id, queued=generation.state == STATE_QUEUED,
+                           progress=json.loads(generation.meta).get("progress", None))
 
 
 def upload_to_db(folder, sid, owner, race):
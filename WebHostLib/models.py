@@ -61,3 +61,8 @@ class Generation(db.Entity):
 class GameDataPackage(db.Entity):
     checksum = PrimaryKey(str)
     data = Required(bytes)
+
+
+class PatchPayload(db.Entity):
+    checksum = PrimaryKey(str)
+    data = Required(bytes, lazy=True)
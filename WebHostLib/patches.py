@@ -0,0 +1,150 @@
+"""
+Storage of patch containers for Slot.data. A container is split into its small archipelago.json manifest, kept in
+Slot.data, and the rest of its zip members, which are stored once per content in PatchPayload. Downloads put the
+stored members, still compressed, back together with a freshly written manifest, without recompressing anything.
+"""
+import hashlib
+import io
+import json
+import pickle
+import struct
+import typing
+import zipfile
+
+from pony.orm import commit, rollback
+from pony.orm.core import TransactionIntegrityError
+
+from Utils import restricted_loads
+from .models import PatchPayload, Slot
+
+patch_record_magic = b"APPATCH\x00\x01"
+"""start of Slot.data holding a split container, followed by a pickled PatchRecord."""
+
+manifest_name = "archipelago.json"
+
+_local_header = struct.Struct(zipfile.structFileHeader)
+_central_header = struct.Struct(zipfile.structCentralDir)
+_end_record = struct.Struct(zipfile.structEndArchive)
+_data_descriptor_signature = b"PK\x07\x08"
+
+
+class PatchRecord(typing.NamedTuple):
+    manifest: typing.Dict[str, typing.Any]
+    payload: str
+    """checksum of the PatchPayload"""
+    directory: bytes
+    """central directory records of the members in the payload"""
+    count: int
+
+
+class ZipMembers(typing.NamedTuple):
+    """Raw zip members, local entries and central directory records with offsets relative to the entries' start."""
+    entries: bytes
+    directory: bytes
+    count: int
+
+
+def _read_members(data: bytes, skip: typing.Container[str] = ()) -> typing.Optional[ZipMembers]:
+    """Copies the raw members of a zip, except the skipped names. Returns None for zips that need zip64."""
+    view = memoryview(data)
+    entries = io.BytesIO()
+    directory = io.BytesIO()
+    count = 0
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        infolist = zf.infolist()
+        if len(infolist) >= 0xFFFF:
+            return None
+        central_offset = zf.start_dir
+        for info in infolist:
+            if max(info.header_offset, info.compress_size, info.file_size) >= 0xFFFFFFFF:
+                return None
+            central_header = _central_header.unpack_from(view, central_offset)
+            central_size = _central_header.size + sum(central_header[12:15])  # name, extra field and comment
+            central_record = bytearray(view[central_offset:central_offset + central_size])
+            central_offset += central_size
+            if info.filename in skip:
+                continue
+
+            header = _local_header.unpack_from(view, info.header_offset)
+            end = info.header_offset + _local_header.size + header[10] + header[11] + info.compress_size
+            if info.flag_bits & 0x08:  # sizes follow the data in a data descriptor
+                end += 16 if view[end:end + 4] == _data_descriptor_signature else 12
+            # point the central record at the entry's new offset
+            struct.pack_into("<L", central_record, 42, entries.tell())
+            entries.write(view[info.header_offset:end])
+            directory.write(central_record)
+            count += 1
+    return ZipMembers(entries.getvalue(), directory.getvalue(), count)
+
+
+def _end_of_directory(count: int, directory_size: int, directory_offset: int) -> bytes:
+    return _end_record.pack(zipfile.stringEndArchive, 0, 0, count, count, directory_size, directory_offset, 0)
+
+
+def store_patch(data: typing.Optional[bytes]) -> typing.Optional[bytes]:
+    """Converts patch container data into what should be stored in Slot.data, storing its payload if it can be split.
+    Data that is not a container with a manifest is returned unchanged. Commits, so call before creating other rows."""
+    if not data or not zipfile.is_zipfile(io.BytesIO(data)):
+        return data
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        if manifest_name not in zf.namelist():
+            return data
+        with zf.open(manifest_name) as f:
+            manifest = json.load(f)
+    members = _read_members(data, (manifest_name,))
+    if members is None:
+        return data
+    checksum = hashlib.sha256(members.entries).hexdigest()
+    if not PatchPayload.exists(checksum=checksum):
+        PatchPayload(checksum=checksum, data=members.entries)
+        try:
+            commit()  # commit payload
+        except TransactionIntegrityError:  # stored by a concurrent upload
+            rollback()
+    return patch_record_magic + pickle.dumps(tuple(PatchRecord(manifest, checksum, members.directory,
+                                                               members.count)))
+
+
+def is_split_patch(data: bytes) -> bool:
+    return data.startswith(patch_record_magic)
+
+
+def get_patch_manifest(slot: Slot) -> typing.Dict[str, typing.Any]:
+    """Retrieves the manifest of a Slot holding a patch container."""
+    if is_split_patch(slot.data):
+        return PatchRecord(*restricted_loads(slot.data[len(patch_record_magic):])).manifest
+    with zipfile.ZipFile(io.BytesIO(slot.data)) as zf, zf.open(manifest_name) as f:
+        return json.load(f)
+
+
+def iter_patch(slot: Slot, manifest: typing.Dict[str, typing.Any]) -> typing.Tuple[int, typing.Iterator[bytes]]:
+    """Puts the container of a Slot back together with the given manifest, returns its size and content in parts.
+    Members are copied as stored, only the manifest is written anew."""
+    if is_split_patch(slot.data):
+        record = PatchRecord(*restricted_loads(slot.data[len(patch_record_magic):]))
+        entries = PatchPayload[record.payload].data
+        members = ZipMembers(entries, record.directory, record.count)
+    else:  # stored whole, from before containers were split
+        members = _read_members(slot.data, (manifest_name,))
+        if members is None:
+            raise ValueError("Patch containers that need zip64 are not supported.")
+
+    manifest_zip = io.BytesIO()
+    with zipfile.ZipFile(manifest_zip, "w") as zf:
+        zf.writestr(manifest_name, json.dumps(manifest))
+    manifest_member = _read_members(manifest_zip.getvalue())
+    manifest_directory = bytearray(manifest_member.directory)
+    struct.pack_into("<L", manifest_directory, 42, len(members.entries))
+
+    directory_offset = len(members.entries) + len(manifest_member.entries)
+    directory_size = len(members.directory) + len(manifest_directory)
+    parts = (members.entries, manifest_member.entries, members.directory, bytes(manifest_directory),
+             _end_of_directory(members.count + 1, directory_size, directory_offset))
+    return sum(len(part) for part in parts), iter(parts)
+
+
+def get_patch(slot: Slot) -> bytes:
+    """Retrieves the data of a Slot as it was generated, putting split containers back together."""
+    if not slot.data or not is_split_patch(slot.data):
+        return slot.data
+    return b"".join(iter_patch(slot, get_patch_manifest(slot))[1])
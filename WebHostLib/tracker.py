@@ -1,7 +1,9 @@
 import datetime
 import collections
+import hashlib
+import threading
 from dataclasses import dataclass
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from typing import Any, Callable, Deque, Dict, List, NamedTuple, Optional, Set, Tuple
 from uuid import UUID
 
 from flask import render_template
@@ -9,14 +11,24 @@ from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
 from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
-from Utils import restricted_loads, KeyedDefaultDict
+from Utils import restricted_loads, KeyedDefaultDict, SaveSections
 from . import app, cache
-from .models import GameDataPackage, Room
+from .models import GameDataPackage, Room, Seed
 
 # Multisave is currently updated, at most, every minute.
 TRACKER_CACHE_TIMEOUT_IN_SECONDS = 60
-
-_multidata_cache = {}
+# Number of seeds and rooms to keep parsed multidata and multisave of between requests, least recently used first out.
+TRACKER_DATA_CACHE_SIZE = 16
+# Number of consecutive multisave changes to remember per room, for incremental tracker updates.
+TRACKER_SAVE_CHANGES_SIZE = 16
+
+_multidata_cache: "collections.OrderedDict[UUID, Dict[str, Any]]" = collections.OrderedDict()
+_multisave_cache: "collections.OrderedDict[UUID, CachedMultisave]" = collections.OrderedDict()
+# Rooms that are polled for incremental updates, only their multisave changes are recorded.
+_save_changes_rooms: Set[UUID] = set()
+# Data packages are stored by checksum, so their lookup tables never go stale and can be shared by all rooms.
+_game_data_cache: Dict[str, "GameLookupTables"] = {}
+_tracker_data_cache_lock = threading.Lock()
 _multiworld_trackers: Dict[str, Callable] = {}
 _player_trackers: Dict[str, Callable] = {}
 
@@ -40,6 +52,161 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+def _get_multidata(seed: Seed) -> Dict[str, Any]:
+    """Retrieves the parsed multidata of a seed, which is static, so it is shared across requests.
+    The returned data must not be modified."""
+    with _tracker_data_cache_lock:
+        multidata = _multidata_cache.get(seed.id)
+        if multidata is not None:
+            _multidata_cache.move_to_end(seed.id)
+            return multidata
+
+    multidata = Context.decompress(seed.multidata)
+    with _tracker_data_cache_lock:
+        _multidata_cache[seed.id] = multidata
+        if len(_multidata_cache) > TRACKER_DATA_CACHE_SIZE:
+            _multidata_cache.popitem(last=False)
+    return multidata
+
+
+@dataclass(frozen=True)
+class SaveChanges:
+    """Tracked changes from the multisave of one version to the multisave of a later version.
+    Hints are new or changed hints, a hint that got found shows up again with found set."""
+    since_version: str
+    version: str
+    checked_locations: Dict[TeamPlayer, Set[int]]
+    received_items: Dict[TeamPlayer, List[NetworkItem]]
+    client_statuses: Dict[TeamPlayer, ClientStatus]
+    hints: Dict[TeamPlayer, Set[Hint]]
+
+    @classmethod
+    def between(cls, since_version: str, old: SaveSections, version: str, new: SaveSections) -> "SaveChanges":
+        def get_changed(section: str) -> Tuple[Dict, Dict]:
+            """The old and new state of a section, both empty if the section did not change."""
+            data = old.get_section_data(section)
+            if data is not None and data == new.get_section_data(section):
+                return {}, {}
+            return old.get(section, {}), new.get(section, {})
+
+        old_checks, new_checks = get_changed("location_checks")
+        checked_locations = {}
+        for team_player, locations in new_checks.items():
+            new_locations = locations - old_checks.get(team_player, set())
+            if new_locations:
+                checked_locations[team_player] = new_locations
+
+        # received items are only ever appended to
+        old_received, new_received = get_changed("received_items")
+        received_items = {}
+        for (team, player, remote), items in new_received.items():
+            if remote:
+                new_items = items[len(old_received.get((team, player, remote), ())):]
+                if new_items:
+                    received_items[team, player] = new_items
+
+        old_statuses, new_statuses = get_changed("client_game_state")
+        client_statuses = {
+            team_player: status for team_player, status in new_statuses.items()
+            if old_statuses.get(team_player, ClientStatus.CLIENT_UNKNOWN) != status
+        }
+
+        old_hints, new_hints = get_changed("hints")
+        hints = {}
+        for team_player, player_hints in new_hints.items():
+            added_hints = player_hints - old_hints.get(team_player, set())
+            if added_hints:
+                hints[team_player] = added_hints
+
+        return cls(since_version, version, checked_locations, received_items, client_statuses, hints)
+
+    def merge(self, later: "SaveChanges") -> "SaveChanges":
+        """Combines these changes with the changes directly following them."""
+        checked_locations = {team_player: set(locations) for team_player, locations in self.checked_locations.items()}
+        for team_player, locations in later.checked_locations.items():
+            checked_locations.setdefault(team_player, set()).update(locations)
+        received_items = {team_player: list(items) for team_player, items in self.received_items.items()}
+        for team_player, items in later.received_items.items():
+            received_items.setdefault(team_player, []).extend(items)
+        hints = {team_player: set(player_hints) for team_player, player_hints in self.hints.items()}
+        for team_player, player_hints in later.hints.items():
+            hints.setdefault(team_player, set()).update(player_hints)
+        return SaveChanges(self.since_version, later.version, checked_locations, received_items,
+                           {**self.client_statuses, **later.client_statuses}, hints)
+
+
+class CachedMultisave(NamedTuple):
+    raw: bytes
+    """The raw save this was parsed from."""
+    version: str
+    multisave: SaveSections
+    changes: Deque[SaveChanges]
+    """The last changes that led up to this save, shared by all saves of the room."""
+
+
+def _get_multisave(room: Room) -> CachedMultisave:
+    """Retrieves the multisave of a room, which is only read again after the room saved since the last call.
+    Trackers of every slot in a room can then share the sections they unpickled. The returned data must not be modified.
+    """
+    raw_multisave = room.multisave or b""
+    with _tracker_data_cache_lock:
+        cached = _multisave_cache.get(room.id)
+        if cached is not None and cached.raw == raw_multisave:
+            _multisave_cache.move_to_end(room.id)
+            return cached
+
+    multisave = SaveSections(raw_multisave)
+    version = hashlib.blake2b(raw_multisave, digest_size=12).hexdigest()
+    new_changes: Optional[SaveChanges] = None
+    if cached is None:
+        changes = collections.deque(maxlen=TRACKER_SAVE_CHANGES_SIZE)
+    else:
+        changes = cached.changes
+        if room.id in _save_changes_rooms:
+            new_changes = SaveChanges.between(cached.version, cached.multisave, version, multisave)
+    with _tracker_data_cache_lock:
+        current = _multisave_cache.get(room.id)
+        if current is not None and current.version == version:  # another request got to it first
+            return current
+        if cached is not None and current is cached:
+            if new_changes is not None:
+                changes.append(new_changes)
+        elif current is not None:
+            changes = collections.deque(maxlen=TRACKER_SAVE_CHANGES_SIZE)
+        result = _multisave_cache[room.id] = CachedMultisave(raw_multisave, version, multisave, changes)
+        _multisave_cache.move_to_end(room.id)
+        if len(_multisave_cache) > TRACKER_DATA_CACHE_SIZE:
+            _save_changes_rooms.discard(_multisave_cache.popitem(last=False)[0])
+    return result
+
+
+@dataclass(frozen=True)
+class GameLookupTables:
+    """Name and id lookup tables of a single game's data package."""
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+def _get_game_lookup_tables(checksum: str) -> GameLookupTables:
+    """Retrieves the lookup tables of the data package with this checksum, building them on first use."""
+    tables = _game_data_cache.get(checksum)
+    if tables is None:
+        game_package = restricted_loads(GameDataPackage.get(checksum=checksum).data)
+        tables = GameLookupTables(
+            KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+                id: name for name, id in game_package["item_name_to_id"].items()}),
+            KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+                id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        )
+        with _tracker_data_cache_lock:
+            tables = _game_data_cache.setdefault(checksum, tables)
+    return tables
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
@@ -49,14 +216,17 @@ class TrackerData:
     """
     room: Room
     _multidata: Dict[str, Any]
-    _multisave: Dict[str, Any]
+    _multisave: SaveSections
     _tracker_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
+        self._multidata = _get_multidata(room.seed)
+        cached_multisave = _get_multisave(room)
+        self._multisave = cached_multisave.multisave
+        self._save_version = cached_multisave.version
+        self._save_changes = cached_multisave.changes
         self._tracker_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,20 +240,44 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            tables = _get_game_lookup_tables(game_package["checksum"])
+            self.item_id_to_name[game] = tables.item_id_to_name
+            self.location_id_to_name[game] = tables.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["item_name_to_id"]
+            self.item_name_to_id[game] = tables.item_name_to_id
+            self.location_name_to_id[game] = tables.location_name_to_id
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
         return self._multidata["seed_name"]
 
+    def get_room_save_version(self) -> str:
+        """Retrieves an identifier of the multisave, which changes whenever the room saves changes."""
+        return self._save_version
+
+    def record_room_save_changes(self) -> None:
+        """Starts recording changes to the multisave of this room, for get_room_save_changes of later requests."""
+        with _tracker_data_cache_lock:
+            _save_changes_rooms.add(self.room.id)
+
+    def get_room_save_changes(self, since_version: str) -> Optional[SaveChanges]:
+        """Retrieves all recorded changes to the multisave since the multisave of the given version.
+        Returns None if they are unknown, as that save is too old or its changes were not recorded by this process.
+        """
+        with _tracker_data_cache_lock:
+            save_changes = list(self._save_changes)
+        merged: Optional[SaveChanges] = None
+        for changes in save_changes:
+            if merged:
+                if changes.since_version == merged.version:
+                    merged = merged.merge(changes)
+            elif changes.since_version == since_version:
+                merged = changes
+        if merged and merged.version == self._save_version:
+            return merged
+        return None
+
     def get_slot_data(self, team: int, player: int) -> Dict[str, Any]:
         """Retrieves the slot data for a given player."""
         return self._multidata["slot_data"][player]
@@ -344,8 +538,9 @@ def get_timeout_and_tracker(tracker: UUID, tracked_team: int, tracked_player: in
 def get_enabled_multiworld_trackers(room: Room) -> Dict[str, Callable]:
     # Render the multitracker for any games that exist in the current room if they are defined.
     enabled_trackers = {}
+    games = {slot_info.game for slot_info in _get_multidata(room.seed)["slot_info"].values()}
     for game_name, endpoint in _multiworld_trackers.items():
-        if any(slot.game == game_name for slot in room.seed.slots):
+        if game_name in games:
             enabled_trackers[game_name] = endpoint
 
     # We resort the tracker to have Generic first, then lexicographically each enabled game.
@@ -4,7 +4,6 @@ import pickle
 import typing
 import uuid
 import zipfile
-import zlib
 
 from io import BytesIO
 from flask import request, flash, redirect, url_for, session, render_template
@@ -15,12 +14,13 @@ import schema
 
 import MultiServer
 from NetUtils import SlotType
-from Utils import VersionException, __version__
+from Utils import VersionException, __version__, dump_multidata
 from worlds import GamesPackage
 from worlds.Files import AutoPatchRegister
 from worlds.AutoWorld import data_package_checksum
 from . import app
 from .models import Seed, Room, Slot, GameDataPackage
+from .patches import store_patch
 
 banned_extensions = (".sfc", ".z64", ".n64", ".nes", ".smc", ".sms", ".gb", ".gbc", ".gba")
 allowed_options_extensions = (".yaml", ".json", ".yml", ".txt", ".zip")
@@ -81,17 +81,20 @@ def process_multidata(compressed_multidata, files={}):
                     rollback()
 
     if "slot_info" in decompressed_multidata:
+        slot_files = {slot: store_patch(data) for slot, data in files.items()}
         for slot, slot_info in decompressed_multidata["slot_info"].items():
             # Ignore Player Groups (e.g. item links)
             if slot_info.type == SlotType.group:
                 continue
-            slots.add(Slot(data=files.get(slot, None),
+            slots.add(Slot(data=slot_files.get(slot, None),
                            player_name=slot_info.name,
                            player_id=slot,
                            game=slot_info.game))
         flush()  # commit slots
 
-    compressed_multidata = compressed_multidata[0:1] + zlib.compress(pickle.dumps(decompressed_multidata), 9)
+    with BytesIO() as buffer:
+        dump_multidata(decompressed_multidata, buffer)
+        compressed_multidata = buffer.getvalue()
     return slots, compressed_multidata
 
 
@@ -13,7 +13,10 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libcpp.algorithm cimport sort
 from libcpp.set cimport set as std_set
+from libcpp.utility cimport pair
+from libcpp.vector cimport vector
 from collections import defaultdict
 
 cdef extern from *:
@@ -27,6 +30,9 @@ cdef extern from *:
 ctypedef uint32_t ap_player_t  # on AMD64 this is faster (and smaller) than 64bit ints
 ctypedef uint32_t ap_flags_t
 ctypedef int64_t ap_id_t
+ctypedef uint32_t ap_index_t  # index into entries, 4G entries would already be 128GB
+
+cdef size_t MAX_INDEXED_COUNT = <ap_index_t>(-1)
 
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
@@ -55,6 +61,8 @@ cdef class LocationStore:
     # This implementation is a flat list of (sender, location, item, receiver, flags) using native integers
     # as well as some mapping arrays used to speed up stuff, saving a lot of memory while speeding up hints.
     # Using std::map might be worth investigating, but memory overhead would be ~100% compared to arrays.
+    # The optional receiver index is a second ordering of entries by (receiver, item, position in entries),
+    # so hints and collect only touch entries for their receiver.
 
     cdef Pool _mem
     cdef object _len
@@ -66,6 +74,9 @@ cdef class LocationStore:
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
     cdef PyObject** _raw_proxies  # 8K/1000 players, faster access to _proxies, but does not keep a ref
+    cdef ap_index_t* receiver_order  # 400KB/100k items, entries sorted by receiver, then item
+    cdef IndexEntry* receiver_index  # 16KB/1000 players, ranges in receiver_order
+    cdef size_t receiver_index_size
 
     def get_size(self):
         from sys import getsizeof
@@ -76,9 +87,11 @@ cdef class LocationStore:
         size += sum(sizeof(item) for item in self._items)
         size += sum(sizeof(proxy) for proxy in self._proxies)
         size += sizeof(self._raw_proxies[0]) * self.sender_index_size
+        if self.receiver_order:
+            size += sizeof(ap_index_t) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         return size
 
-    def __cinit__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
+    def __cinit__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]], build_indexes: bool = True) -> None:
         self._mem = None
         self._keys = None
         self._items = None
@@ -89,8 +102,15 @@ cdef class LocationStore:
         self.sender_index = NULL
         self.sender_index_size = 0
         self._raw_proxies = NULL
-
-    def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]]) -> None:
+        self.receiver_order = NULL
+        self.receiver_index = NULL
+        self.receiver_index_size = 0
+
+    def __init__(self, locations_dict: Dict[int, Dict[int, Sequence[int]]], build_indexes: bool = True) -> None:
+        """
+        :param locations_dict: sender -> location -> (item, receiver, flags)
+        :param build_indexes: index entries by receiver and item, speeding up find_item and get_for_player
+        """
         self._mem = Pool()
         cdef object key
         self._keys = []
@@ -99,6 +119,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -113,6 +134,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -166,6 +188,58 @@ cdef class LocationStore:
         self.entry_count = count
         self._len = sender_count
 
+        if build_indexes and count and count <= MAX_INDEXED_COUNT:
+            self._build_receiver_index(max_receiver)
+
+    cdef void _build_receiver_index(self, size_t max_receiver) except *:
+        cdef size_t i
+        cdef size_t start
+        cdef LocationEntry* entry
+        cdef vector[pair[ap_id_t, ap_index_t]] keys
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
+        self.receiver_order = <ap_index_t*>self._mem.alloc(self.entry_count, sizeof(ap_index_t))
+        self.receiver_index_size = max_receiver + 1
+        # bucket entries by receiver, keeping their order in entries
+        for i in range(self.entry_count):
+            self.receiver_index[self.entries[i].receiver].count += 1
+        start = 0
+        for i in range(self.receiver_index_size):
+            self.receiver_index[i].start = start
+            start += self.receiver_index[i].count
+            self.receiver_index[i].count = 0
+        keys.resize(self.entry_count)
+        for i in range(self.entry_count):
+            entry = self.entries + i
+            start = self.receiver_index[entry.receiver].start + self.receiver_index[entry.receiver].count
+            keys[start].first = entry.item
+            keys[start].second = <ap_index_t>i
+            self.receiver_index[entry.receiver].count += 1
+        # then sort each bucket by item, ties stay in entries order
+        for i in range(self.receiver_index_size):
+            start = self.receiver_index[i].start
+            sort(keys.begin() + start, keys.begin() + start + self.receiver_index[i].count)
+        for i in range(self.entry_count):
+            self.receiver_order[i] = keys[i].second
+
+    cdef size_t _find_receiver_item(self, ap_player_t receiver, ap_id_t item, size_t* end) noexcept nogil:
+        """Returns the range in receiver_order for receiver and item, start == end if there is none."""
+        cdef size_t l = self.receiver_index[receiver].start
+        cdef size_t r = l + self.receiver_index[receiver].count
+        cdef size_t stop = r
+        cdef size_t m
+        # binary search lower bound of item
+        while l < r:
+            m = (l + r) // 2
+            if self.entries[self.receiver_order[m]].item < item:
+                l = m + 1
+            else:
+                r = m
+        r = l
+        while r < stop and self.entries[self.receiver_order[r]].item == item:
+            r += 1
+        end[0] = r
+        return l
+
     # fake dict access
     def __len__(self) -> int:
         return self._len
@@ -198,7 +272,22 @@ cdef class LocationStore:
         cdef ap_player_t receiver
         cdef std_set[ap_player_t] receivers
         cdef size_t slot_count = len(slots)
-        if slot_count == 1:
+        cdef size_t start
+        cdef size_t end
+        cdef ap_index_t i
+        cdef vector[ap_index_t] found
+        if self.receiver_order:
+            # indexed implementation, yielding in entries order like the scan below
+            for receiver in slots:
+                if receiver < self.receiver_index_size:
+                    start = self._find_receiver_item(receiver, item, &end)
+                    found.insert(found.end(), self.receiver_order + start, self.receiver_order + end)
+            if slot_count > 1:
+                sort(found.begin(), found.end())
+            for i in found:
+                entry = self.entries[i]
+                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
+        elif slot_count == 1:
             # specialized implementation for single slot
             receiver = list(slots)[0]
             with nogil:
@@ -218,12 +307,29 @@ cdef class LocationStore:
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
         cdef ap_player_t receiver = slot
+        cdef size_t start
+        cdef ap_index_t i
+        cdef vector[ap_index_t] found
+        cdef object sender
         all_locations: Dict[int, Set[int]] = {}
+        if self.receiver_order:
+            if receiver < self.receiver_index_size:
+                start = self.receiver_index[receiver].start
+                found.assign(self.receiver_order + start,
+                             self.receiver_order + start + self.receiver_index[receiver].count)
+                sort(found.begin(), found.end())  # sender order, like the scan below
+            for i in found:
+                entry = self.entries[i]
+                sender = entry.sender
+                if sender not in all_locations:
+                    all_locations[sender] = set()
+                all_locations[sender].add(entry.location)
+            return all_locations
         with nogil:
             for entry in self.entries[:self.entry_count]:
                 if entry.receiver == receiver:
                     with gil:
-                        sender: int = entry.sender
+                        sender = entry.sender
                         if sender not in all_locations:
                             all_locations[sender] = set()
                         all_locations[sender].add(entry.location)
@@ -665,6 +665,16 @@ class GeneratorOptions(Group):
         OFF = 0
         ON = 1
 
+    class MultidataCompressionLevel(int):
+        """
+        zlib compression level of the generated .archipelago file.
+        1 is the fastest, 9 the smallest. Generating big multiworlds is noticeably faster on lower levels.
+        """
+        def __new__(cls, value: int) -> "GeneratorOptions.MultidataCompressionLevel":
+            if not -1 <= value <= 9:
+                raise ValueError(f"{cls.__name__} has to be from 0 to 9, or -1 for zlib's default, not {value}")
+            return super().__new__(cls, value)
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -674,6 +684,7 @@ class GeneratorOptions(Group):
     glitch_triforce_room: GlitchTriforceRoom = GlitchTriforceRoom(1)  # why is this here?
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
+    multidata_compression_level: MultidataCompressionLevel = MultidataCompressionLevel(9)
 
 
 class SNIOptions(Group):
@@ -0,0 +1,79 @@
+"""
+Measures time and memory used by CollectionState.copy on a multiworld with every item collected,
+as well as the time taken to fill that multiworld.
+Run from the repository root with `python -m test.benchmark.collection_state`.
+"""
+
+if __name__ == "__main__":
+    import argparse
+    import gc
+    import logging
+    import tracemalloc
+    import typing
+
+    from Utils import init_logging
+    from BaseClasses import MultiWorld, CollectionState
+    from Fill import distribute_items_restrictive
+    from worlds import AutoWorld
+    from worlds.AutoWorld import call_all
+    from test.benchmark import TimeIt
+
+    init_logging("CollectionState Benchmark")
+    logger = logging.getLogger("Benchmark")
+
+    class CollectionStateBenchmark:
+        gen_steps: typing.Tuple[str, ...] = (
+            "generate_early", "create_regions", "create_items", "set_rules", "generate_basic", "pre_fill")
+
+        def __init__(self, players: int, seed: int, copies: int):
+            self.players = players
+            self.seed = seed
+            self.copies = copies
+
+        def setup_multiworld(self, game: str) -> MultiWorld:
+            multiworld = MultiWorld(self.players)
+            multiworld.player_name = {}
+            for player in multiworld.player_ids:
+                multiworld.game[player] = game
+                multiworld.player_name[player] = f"Tester{player}"
+            multiworld.set_seed(self.seed)
+            multiworld.state = CollectionState(multiworld)
+            args = argparse.Namespace()
+            world_type = AutoWorld.AutoWorldRegister.world_types[game]
+            for name, option in world_type.options_dataclass.type_hints.items():
+                setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+            multiworld.set_options(args)
+            for step in self.gen_steps:
+                call_all(multiworld, step)
+            return multiworld
+
+        def copy_test(self, state: CollectionState) -> None:
+            with TimeIt(f"{self.copies} copies of a {self.players} player state", logger) as timer:
+                for _ in range(self.copies):
+                    state.copy()
+            gc.collect()
+            tracemalloc.start()
+            copies = [state.copy() for _ in range(self.copies)]
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            logger.info(f"{timer.dif / self.copies * 1000:.3f} ms and {memory / len(copies) / 1024:.1f} KiB per copy.")
+
+        def main(self, game: str) -> None:
+            multiworld = self.setup_multiworld(game)
+            state = multiworld.get_all_state(False)
+            for player in multiworld.player_ids:
+                state.update_reachable_regions(player)
+            self.copy_test(state)
+
+            with TimeIt(f"{game} fill of {self.players} players", logger):
+                distribute_items_restrictive(multiworld)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", nargs="+", default=["A Link to the Past"])
+    parser.add_argument("--players", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--copies", type=int, default=100)
+    arguments = parser.parse_args()
+    benchmark = CollectionStateBenchmark(arguments.players, arguments.seed, arguments.copies)
+    for game_name in arguments.games:
+        benchmark.main(game_name)
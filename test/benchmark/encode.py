@@ -0,0 +1,62 @@
+"""
+Measures NetUtils.encode against the json based encoder it replaces on packets shaped like what MultiServer sends.
+Run from the repository root with `python -m test.benchmark.encode`.
+"""
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+    import random
+    import timeit
+    import typing
+
+    import NetUtils
+    from NetUtils import NetworkItem, NetworkPlayer, NetworkSlot, SlotType, encode
+    from Utils import init_logging
+
+    init_logging("Encode Benchmark")
+    logger = logging.getLogger("Benchmark")
+
+    def json_encode(obj: typing.Any) -> str:
+        return NetUtils._encode(NetUtils._scan_for_TypedTuples(obj))
+
+    def make_packets(players: int, items: int, seed: int) -> typing.Dict[str, typing.List[typing.Any]]:
+        rng = random.Random(seed)
+        return {
+            "ReceivedItems": [{
+                "cmd": "ReceivedItems", "index": 0,
+                "items": [NetworkItem(rng.randrange(1 << 20), rng.randrange(1 << 20), rng.randrange(1, players + 1),
+                                      rng.choice((0, 1, 2, 4))) for _ in range(items)]}],
+            "Connected": [{
+                "cmd": "Connected", "team": 0, "slot": 1,
+                "players": [NetworkPlayer(0, slot, f"Player{slot}", f"Player{slot}") for slot in range(1, players + 1)],
+                "missing_locations": list(range(items)), "checked_locations": list(range(items, items * 2)),
+                "slot_info": {slot: NetworkSlot(f"Player{slot}", "Game", SlotType.player)
+                              for slot in range(1, players + 1)},
+                "hint_points": 0, "slot_data": {"seed": rng.getrandbits(64), "options": list(range(50))}}],
+            "DataPackage": [{"cmd": "DataPackage", "data": {"games": {f"Game{game}": {
+                "item_name_to_id": {f"Item {item}": item for item in range(items)},
+                "location_name_to_id": {f"Location {location}": location for location in range(items)},
+                "checksum": f"{rng.getrandbits(160):040x}"} for game in range(20)}}}],
+            "PrintJSON": [{"cmd": "PrintJSON", "type": "ItemSend", "receiving": 2, "item": NetworkItem(1, 2, 3, 1),
+                           "data": [{"type": "player_id", "text": "1"}, {"text": " sent "},
+                                    {"type": "item_id", "text": "1", "player": 2, "flags": 1},
+                                    {"text": " to "}, {"type": "player_id", "text": "2"}]}] * 300,
+        }
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number", type=int, default=10)
+    arguments = parser.parse_args()
+    if not NetUtils.orjson:
+        logger.warning("orjson is not installed, both encoders use json.")
+    for name, packet in make_packets(arguments.players, arguments.items, arguments.seed).items():
+        assert encode(packet) == json_encode(packet), f"{name} encoded differently"
+        results = []
+        for encoder in (json_encode, encode):
+            taken = min(timeit.repeat(lambda: encoder(packet), number=arguments.number, repeat=3))
+            results.append(taken / arguments.number * 1000)
+        logger.info(f"{name}: json {results[0]:.2f} ms, encode {results[1]:.2f} ms, "
+                    f"{results[0] / results[1]:.1f}x as fast.")
@@ -0,0 +1,72 @@
+"""
+Measures time, peak memory and size of writing multidata in .archipelago format version 3
+(pickle.dumps, then zlib.compress of the whole blob) against the streaming writer of the current format.
+Run from the repository root with `python -m test.benchmark.multidata`.
+"""
+
+if __name__ == "__main__":
+    import argparse
+    import gc
+    import logging
+    import os
+    import pickle
+    import random
+    import tempfile
+    import tracemalloc
+    import typing
+    import zlib
+
+    from NetUtils import Hint, NetworkSlot, SlotType
+    from Utils import dump_multidata, init_logging
+    from test.benchmark import TimeIt
+
+    init_logging("Multidata Benchmark")
+    logger = logging.getLogger("Benchmark")
+
+    def make_multidata(players: int, locations: int, seed: int) -> typing.Dict[str, typing.Any]:
+        """Builds multidata shaped like Main.write_multidata's, with random placements."""
+        rng = random.Random(seed)
+        locations_data = {
+            player: {location: (rng.randrange(1, 1000), rng.randrange(1, players + 1), rng.choice((0, 1, 2, 4)))
+                     for location in range(1, locations + 1)}
+            for player in range(1, players + 1)
+        }
+        return {
+            "slot_data": {player: {"seed": rng.getrandbits(64), "options": list(range(50))}
+                          for player in range(1, players + 1)},
+            "slot_info": {player: NetworkSlot(f"Player{player}", "Game", SlotType.player)
+                          for player in range(1, players + 1)},
+            "connect_names": {f"Player{player}": (0, player) for player in range(1, players + 1)},
+            "locations": locations_data,
+            "precollected_hints": {player: {Hint(player, player, 1, 1, False)} for player in range(1, players + 1)},
+            "seed_name": str(seed),
+        }
+
+    def format_3(multidata: typing.Dict[str, typing.Any], file: typing.BinaryIO, level: int) -> None:
+        file.write(bytes([3]))
+        file.write(zlib.compress(pickle.dumps(multidata), level))
+
+    def measure(name: str, writer: typing.Callable[..., None], multidata: typing.Dict[str, typing.Any],
+                level: int) -> None:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "benchmark.archipelago")
+            gc.collect()
+            tracemalloc.start()
+            with TimeIt(f"{name} at level {level}", logger):
+                with open(path, "wb") as file:
+                    writer(multidata, file, level)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            logger.info(f"{name} at level {level}: peak {peak / 1024 / 1024:.1f} MiB, "
+                        f"file {os.path.getsize(path) / 1024 / 1024:.1f} MiB.")
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--players", type=int, default=500)
+    parser.add_argument("--locations", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--levels", type=int, nargs="+", default=[9, 6, 1])
+    arguments = parser.parse_args()
+    data = make_multidata(arguments.players, arguments.locations, arguments.seed)
+    for compression_level in arguments.levels:
+        measure("format 3", format_3, data, compression_level)
+        measure("streaming", dump_multidata, data, compression_level)
@@ -0,0 +1,123 @@
+"""
+Measures the memory it takes to host WebHost rooms, either with a process per room or shared by room workers.
+Rooms are hosted from a temporary sqlite database, memory is the summed proportional set size of the hosting processes,
+so it is only available on Linux.
+Run from the repository root with `python -m test.benchmark.room_memory`.
+"""
+
+if __name__ == "__main__":
+    import argparse
+    import datetime
+    import logging
+    import multiprocessing
+    import os
+    import tempfile
+    import time
+    import typing
+    import uuid
+
+    from Utils import init_logging
+
+    init_logging("Room Memory Benchmark")
+    logger = logging.getLogger("Benchmark")
+
+    def process_memory(pid: int) -> int:
+        """Proportional set size of the process in bytes, counting pages shared with n processes as 1/n."""
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+        raise Exception(f"No Pss found for process {pid}.")
+
+    def create_rooms(count: int, players: int) -> typing.List[uuid.UUID]:
+        from pony.orm import db_session
+
+        from WebHostLib.check import roll_options
+        from WebHostLib.generate import gen_game
+        from WebHostLib.models import Room, Seed
+
+        options = {f"Player{player}.yaml": {"game": "Clique", "name": f"Player{player}", "Clique": {}}
+                   for player in range(1, players + 1)}
+        results, rolled = roll_options(options)
+        assert all(result is True for result in results.values()), results
+        owner = uuid.uuid4()
+        seed_id = gen_game({name: vars(options) for name, options in rolled.items()}, owner=owner)
+        with db_session:
+            seed = Seed.get(id=seed_id)
+            return [Room(seed=seed, owner=owner, timeout=600).id for _ in range(count)]
+
+    def wait_for_rooms(room_ids: typing.List[uuid.UUID], timeout: float = 120):
+        from pony.orm import db_session, select
+
+        from WebHostLib.models import Room
+
+        start = time.perf_counter()
+        while time.perf_counter() - start < timeout:
+            with db_session:
+                if select(room for room in Room if room.id in room_ids and room.last_port > 0).count() == len(room_ids):
+                    return
+            time.sleep(0.5)
+        raise Exception("Rooms did not come up in time.")
+
+    def host_rooms(room_ids: typing.List[uuid.UUID], workers: int, ponyconfig: dict) -> typing.List[multiprocessing.Process]:
+        from WebHostLib.customserver import get_static_server_data, run_room_worker, run_server_process
+
+        static_server_data = get_static_server_data()
+        processes = []
+        if workers:
+            queues = [multiprocessing.Queue() for _ in range(workers)]
+            for worker_id, room_queue in enumerate(queues):
+                processes.append(multiprocessing.Process(target=run_room_worker, args=(
+                    worker_id, room_queue, multiprocessing.Queue(), ponyconfig, static_server_data, None, None, "")))
+            for index, room_id in enumerate(room_ids):
+                queues[index % workers].put(room_id)
+        else:
+            for room_id in room_ids:
+                processes.append(multiprocessing.Process(target=run_server_process, args=(
+                    room_id, ponyconfig, static_server_data, None, None, "")))
+        for process in processes:
+            process.start()
+        return processes
+
+    def main():
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--rooms", type=int, default=20)
+        parser.add_argument("--players", type=int, default=4, help="Clique players per room.")
+        parser.add_argument("--workers", type=int, nargs="*", default=[0, os.cpu_count()],
+                            help="Room worker counts to measure, 0 hosts every room in a process of its own.")
+        arguments = parser.parse_args()
+        multiprocessing.set_start_method("spawn")
+
+        from pony.orm import db_session
+
+        from WebHostLib.models import db, Room
+
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)  # file locks
+            ponyconfig = {"provider": "sqlite", "filename": os.path.join(directory, "ap.db3"), "create_db": True}
+            db.bind(**ponyconfig)
+            db.generate_mapping(create_tables=True)
+            room_ids = create_rooms(arguments.rooms, arguments.players)
+            ponyconfig["create_db"] = False
+
+            for workers in arguments.workers:
+                processes = host_rooms(room_ids, workers, ponyconfig)
+                try:
+                    wait_for_rooms(room_ids)
+                    time.sleep(2)  # let the rooms settle after setup
+                    memory = sum(process_memory(process.pid) for process in processes)
+                finally:
+                    for process in processes:
+                        process.terminate()
+                    for process in processes:
+                        process.join()
+                mode = f"{workers} room workers" if workers else "a process per room"
+                logger.info(f"{arguments.rooms} rooms with {mode}: {memory / 1024 ** 2:.1f} MiB total, "
+                            f"{memory / arguments.rooms / 1024 ** 2:.2f} MiB per room.")
+
+                with db_session:
+                    for room in Room.select(lambda room: room.id in room_ids):
+                        room.last_port = 0
+                        room.last_activity = datetime.datetime.utcnow()
+
+    main()
@@ -0,0 +1,126 @@
+"""
+Measures how long it takes to render the trackers of a large WebHost room, with the parsed multidata, multisave and data
+package lookup tables cached across requests and with them rebuilt for every request, as a cache miss used to do.
+The room is hosted from a temporary sqlite database and given a save with half of all locations checked.
+Run from the repository root with `python -m test.benchmark.tracker`.
+"""
+
+if __name__ == "__main__":
+    import argparse
+    import logging
+    import os
+    import pickle
+    import random
+    import statistics
+    import tempfile
+    import time
+    import typing
+    import uuid
+
+    from Utils import init_logging
+
+    init_logging("Tracker Benchmark")
+    logger = logging.getLogger("Benchmark")
+
+    def create_room(players: int, games: typing.List[str]) -> uuid.UUID:
+        from pony.orm import db_session
+
+        from MultiServer import Context
+        from NetUtils import ClientStatus, Hint, NetworkItem
+        from Utils import dump_save_sections
+        from WebHostLib.check import roll_options
+        from WebHostLib.generate import gen_game
+        from WebHostLib.models import Room, Seed
+
+        options = {}
+        for player in range(1, players + 1):
+            game = games[player % len(games)]
+            options[f"Player{player}.yaml"] = {"game": game, "name": f"Player{player}", game: {}}
+        results, rolled = roll_options(options)
+        assert all(result is True for result in results.values()), results
+        owner = uuid.uuid4()
+        seed_id = gen_game({name: vars(options) for name, options in rolled.items()}, owner=owner)
+
+        with db_session:
+            seed = Seed.get(id=seed_id)
+            multidata = Context.decompress(seed.multidata)
+            location_checks = {}
+            received_items = {}
+            hints = {}
+            for player, locations in multidata["locations"].items():
+                checked = set(random.sample(sorted(locations), len(locations) // 2))
+                location_checks[0, player] = checked
+                for location in checked:
+                    item, receiver, flags = locations[location]
+                    received_items.setdefault((0, receiver, True), []).append(
+                        NetworkItem(item, location, player, flags))
+                for location in random.sample(sorted(locations), min(2, len(locations))):
+                    item, receiver, flags = locations[location]
+                    hint = Hint(receiver, player, location, item, location in checked, "", flags)
+                    hints.setdefault((0, player), set()).add(hint)
+                    hints.setdefault((0, receiver), set()).add(hint)
+            multisave = {
+                "location_checks": location_checks,
+                "received_items": received_items,
+                "hints": hints,
+                "client_game_state": {(0, player): random.choice((ClientStatus.CLIENT_PLAYING, ClientStatus.CLIENT_GOAL))
+                                      for player in multidata["slot_info"]},
+                "client_activity_timers": tuple(((0, player), time.time() - random.randrange(3600))
+                                                for player in multidata["slot_info"]),
+            }
+            multisave = dump_save_sections({section: pickle.dumps(value) for section, value in multisave.items()})
+            return Room(seed=seed, owner=owner, tracker=uuid.uuid4(), multisave=multisave).tracker
+
+    def render_trackers(tracker: uuid.UUID, player: int, cached: bool) -> typing.Tuple[float, float]:
+        from pony.orm import db_session
+
+        from WebHostLib import app, tracker as tracker_module
+        from WebHostLib.models import Room
+
+        with db_session, app.test_request_context():
+            if not cached:
+                tracker_module._multidata_cache.clear()
+                tracker_module._game_data_cache.clear()
+                tracker_module._multisave_cache.clear()
+            start = time.perf_counter()
+            room = Room.get(tracker=tracker)
+            tracker_data = tracker_module.TrackerData(room)
+            enabled_trackers = list(tracker_module.get_enabled_multiworld_trackers(room).keys())
+            tracker_module.render_generic_multiworld_tracker(tracker_data, enabled_trackers)
+            multiworld_time = time.perf_counter() - start
+
+            if not cached:
+                tracker_module._multidata_cache.clear()
+                tracker_module._game_data_cache.clear()
+                tracker_module._multisave_cache.clear()
+            start = time.perf_counter()
+            tracker_module.get_timeout_and_tracker(tracker, 0, player, False)
+            player_time = time.perf_counter() - start
+        return multiworld_time, player_time
+
+    def main():
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--players", type=int, default=500, help="Slots in the room.")
+        parser.add_argument("--games", nargs="+", help="Games the slots are spread over.",
+                            default=["Clique", "ChecksFinder", "Meritous", "Raft", "Risk of Rain 2", "Rogue Legacy",
+                                     "Subnautica", "Timespinner"])
+        parser.add_argument("--runs", type=int, default=10, help="Renders of each tracker to measure.")
+        arguments = parser.parse_args()
+
+        from WebHostLib.models import db
+
+        with tempfile.TemporaryDirectory() as directory:
+            db.bind(provider="sqlite", filename=os.path.join(directory, "ap.db3"), create_db=True)
+            db.generate_mapping(create_tables=True)
+            tracker = create_room(arguments.players, arguments.games)
+            render_trackers(tracker, 1, True)  # warm up templates and imports
+
+            for cached in (False, True):
+                times = [render_trackers(tracker, random.randint(1, arguments.players), cached)
+                         for _ in range(arguments.runs)]
+                mode = "cached" if cached else "uncached"
+                logger.info(f"{arguments.players} slot room, {mode}: "
+                            f"multiworld tracker {statistics.median(run[0] for run in times) * 1000:.1f} ms, "
+                            f"player tracker {statistics.median(run[1] for run in times) * 1000:.1f} ms (medians).")
+
+    main()
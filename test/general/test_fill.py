@@ -1,14 +1,16 @@
 from typing import List, Iterable
+import tracemalloc
 import unittest
 
 import Options
 from Options import Accessibility
 from worlds.AutoWorld import World
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
+from Fill import FillError, LocationCandidates, MaximumExplorationState, balance_multiworld_progression, \
+    fill_restrictive, distribute_early_items, distribute_items_restrictive, sweep_from_pool
 from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
     ItemClassification, CollectionState
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
+from Utils import GenerationProfiler
 
 
 def generate_multi_world(players: int = 1) -> MultiWorld:
@@ -310,6 +312,21 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertRaises(FillError, fill_restrictive, multi_world, multi_world.state,
                           player1.locations.copy(), player1.prog_items.copy())
 
+    def test_impossible_fill_profiled(self):
+        """Test that a failing fill still ends its profiled step"""
+        multi_world = generate_multi_world()
+        multi_world.profiler = profiler = GenerationProfiler()
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        player1 = generate_player_data(multi_world, 1, 1, 1)
+        multi_world.completion_condition[player1.id] = lambda state: state.has(
+            player1.prog_items[0].name, player1.id)
+        set_rule(player1.locations[0], lambda state: False)
+
+        self.assertRaises(FillError, fill_restrictive, multi_world, multi_world.state,
+                          player1.locations.copy(), player1.prog_items.copy(), name="Impossible")
+        self.assertEqual([(step["category"], step["name"]) for step in profiler.steps], [("fill", "Impossible")])
+
     def test_circular_fill(self):
         """Test that fill raises an error when it can't place all items"""
         multi_world = generate_multi_world()
@@ -515,6 +532,65 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
 
+    def test_maximum_exploration_state_matches_sweep_from_pool(self):
+        """Test that taking items out of and adding items back to a MaximumExplorationState matches a fresh sweep"""
+        multi_world = generate_multi_world()
+        player1 = generate_player_data(multi_world, 1, 0, 40)
+        items = player1.prog_items
+        exploration = MaximumExplorationState(multi_world.state, items)
+        pool = items.copy()
+
+        def check() -> None:
+            self.assertEqual(exploration.sweep().prog_items[player1.id],
+                             sweep_from_pool(multi_world.state, pool).prog_items[player1.id])
+
+        check()
+        for item in items[:10]:
+            exploration.remove(item)
+            pool.remove(item)
+            check()
+        # added back and taken out again
+        exploration.collect(items[0])
+        pool.append(items[0])
+        check()
+        exploration.remove(items[0])
+        pool.remove(items[0])
+        check()
+        # taken out of order
+        exploration.remove(items[-1])
+        pool.remove(items[-1])
+        check()
+        for item in items[1:10]:
+            exploration.collect(item)
+            pool.append(item)
+        check()
+
+
+    def test_location_candidates_keep_order(self):
+        """Test that LocationCandidates takes the same locations as scanning the list in order with can_fill"""
+        multi_world = generate_multi_world(2)
+        player1 = generate_player_data(multi_world, 1, 6, 2)
+        player2 = generate_player_data(multi_world, 2, 4, 2)
+        locations = [location for pair in zip(player1.locations, player2.locations) for location in pair] \
+            + player1.locations[4:]
+        item = player1.prog_items[0]
+        set_rule(locations[0], lambda state: state.has(player1.prog_items[1].name, player1.id))
+        add_item_rule(locations[1], lambda item: item.player == 2)
+        locations[2].progress_type = LocationProgressType.EXCLUDED
+
+        candidates = LocationCandidates(locations.copy())
+        expected = locations.copy()
+        for player in (None, 2, 1, None, None):
+            location = candidates.take(multi_world.state, item, True, player)
+            self.assertIs(location, next(location for location in expected if location.can_fill(
+                multi_world.state, item) and (player is None or location.player == player)))
+            expected.remove(location)
+        self.assertEqual(candidates.remaining(), expected)
+        self.assertEqual(len(candidates), len(expected))
+        self.assertIsNone(candidates.take(multi_world.state, item, True, 2))
+        self.assertIs(candidates.take(multi_world.state, item, False), locations[0])
+
+
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
         """Test that distribute_items_restrictive is deterministic"""
@@ -857,6 +933,17 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
         self.assertRegionContains(
             self.player1.regions[1], self.player2.prog_items[0])
 
+    def test_spheres_follow_balancing(self) -> None:
+        """Tests that cached spheres are recomputed after progression balancing swapped items"""
+        self.multi_world.progression_balancing[self.player1.id].value = 50
+        self.multi_world.progression_balancing[self.player2.id].value = 50
+        moved_item = self.player2.prog_items[0]
+
+        self.assertIn(moved_item.location, list(self.multi_world.get_spheres())[1])
+        balance_multiworld_progression(self.multi_world)
+        self.assertIn(moved_item.location, list(self.multi_world.get_spheres())[0])
+        self.assertTrue(self.multi_world.can_beat_game())
+
     def test_balances_progression_light(self) -> None:
         """Test that progression balancing still moves items earlier on minimum value"""
         self.multi_world.progression_balancing[self.player1.id].value = 1
@@ -909,3 +996,38 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+
+class TestPlaythrough(unittest.TestCase):
+    def test_world_collecting_filler(self) -> None:
+        """Tests that the playthrough only relies on advancement items, even if a world's collect tracks filler"""
+        class CoinWorld(World):
+            item_name_to_id = {}
+            location_name_to_id = {}
+
+            def collect_item(self, state: CollectionState, item: Item, remove: bool = False):
+                if item.name == "Coin":
+                    return item.name
+                return super().collect_item(state, item, remove)
+
+        multi_world = generate_multi_world()
+        world = CoinWorld(multi_world, 1)
+        world.options = multi_world.worlds[1].options
+        multi_world.worlds[1] = world
+        menu = multi_world.get_region("Menu", 1)
+        lamp, torch, key, coin, sword, win = generate_locations(6, 1, None, menu)
+        set_rule(torch, lambda state: state.has("Lamp", 1))
+        set_rule(key, lambda state: state.has("Torch", 1))
+        # reachable early through the filler Coin, but logically only once Key is found
+        set_rule(sword, lambda state: state.has_any({"Coin", "Key"}, 1))
+        set_rule(win, lambda state: state.has("Sword", 1))
+        for location, name in ((lamp, "Lamp"), (torch, "Torch"), (key, "Key"), (sword, "Sword"), (win, "Win")):
+            multi_world.push_item(location, Item(name, ItemClassification.progression, None, 1), False)
+        multi_world.push_item(coin, Item("Coin", ItemClassification.filler, None, 1), False)
+        multi_world.completion_condition[1] = lambda state: state.has("Win", 1)
+
+        self.assertIn(sword, list(multi_world.get_spheres())[1])
+        self.assertTrue(multi_world.can_beat_game())
+        multi_world.spoiler.create_playthrough(create_paths=False)
+        self.assertEqual([list(sphere.values()) for sphere in list(multi_world.spoiler.playthrough.values())[1:]],
+                         [[name] for name in ("Lamp", "Torch", "Key", "Sword", "Win")])
@@ -30,3 +30,11 @@ class TestIDs(unittest.TestCase):
                 self.assertIn(option_key, utils_options)
                 for sub_option_key in option_set:
                     self.assertIn(sub_option_key, utils_options[option_key])
+
+    def test_compression_level_checked_on_load(self) -> None:
+        """Tests that an out of range multidata compression level is rejected when host.yaml is loaded"""
+        utils_options = Settings(None)
+        utils_options.update({"generator": {"multidata_compression_level": 1}})
+        self.assertEqual(utils_options.generator.multidata_compression_level, 1)
+        with self.assertRaises(ValueError):
+            utils_options.update({"generator": {"multidata_compression_level": 10}})
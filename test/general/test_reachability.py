@@ -1,6 +1,6 @@
 import unittest
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, SphereFrontier
 from worlds.AutoWorld import AutoWorldRegister
 from . import setup_solo_multiworld
 
@@ -69,3 +69,43 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+    def test_copied_state_does_not_change_original(self):
+        """Ensure collecting into and updating a copied state leaves the state it was copied from untouched"""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                world = setup_solo_multiworld(world_type)
+                if not world.get_regions():
+                    continue
+                state = CollectionState(world)
+                state.update_reachable_regions(1)
+                reachable_regions = state.reachable_regions[1].copy()
+                blocked_connections = state.blocked_connections[1].copy()
+                prog_items = state.prog_items[1].copy()
+                copied_state = state.copy()
+                for item in world.itempool + world.worlds[1].get_pre_fill_items():
+                    copied_state.collect(item, True)
+                copied_state.update_reachable_regions(1)
+                self.assertEqual(state.reachable_regions[1], reachable_regions)
+                self.assertEqual(state.blocked_connections[1], blocked_connections)
+                self.assertEqual(state.prog_items[1], prog_items)
+                self.assertGreaterEqual(copied_state.reachable_regions[1], reachable_regions)
+
+    def test_sphere_frontier_matches_rescan(self):
+        """Ensure only retrying locations affected by state changes finds the same locations as rescanning all"""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            with self.subTest("Game", game=game_name):
+                world = setup_solo_multiworld(world_type)
+                state = CollectionState(world)
+                frontier = SphereFrontier(state, world.get_locations())
+                remaining = set(world.get_locations())
+                items = sorted(world.itempool + world.worlds[1].get_pre_fill_items())
+                world.random.shuffle(items)
+                for index in range(0, len(items) + 8, 8):
+                    expected = {location for location in remaining if location.can_reach(state)}
+                    self.assertEqual(frontier.next_sphere(), expected,
+                                     f"Differing locations after collecting {index}/{len(items)} items.")
+                    remaining -= expected
+                    for item in items[index:index + 8]:
+                        state.collect(item, True)
+
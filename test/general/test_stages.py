@@ -0,0 +1,41 @@
+import tracemalloc
+import unittest
+from argparse import Namespace
+from typing import Any, Dict, List, Optional
+
+from BaseClasses import CollectionState, MultiWorld
+from Utils import GenerationProfiler
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import gen_steps
+
+
+def setup_multiworld(games: List[str], seed: int, profiler: Optional[GenerationProfiler] = None) -> MultiWorld:
+    multiworld = MultiWorld(len(games))
+    multiworld.profiler = profiler
+    multiworld.game = dict(enumerate(games, start=1))
+    multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+    multiworld.set_seed(seed)
+    multiworld.state = CollectionState(multiworld)
+    options: Dict[str, Dict[int, Any]] = {}
+    for player, game in multiworld.game.items():
+        for name, option in AutoWorldRegister.world_types[game].options_dataclass.type_hints.items():
+            options.setdefault(name, {})[player] = option.from_any(option.default)
+    multiworld.set_options(Namespace(**options))
+    for step in gen_steps:
+        call_all(multiworld, step)
+    return multiworld
+
+
+class TestProfiler(unittest.TestCase):
+    def test_profiler_records_world_stages(self):
+        """Every stage of every world should show up in the profile, attributed to its player."""
+        if not tracemalloc.is_tracing():
+            self.addCleanup(tracemalloc.stop)
+        profiler = GenerationProfiler()
+        setup_multiworld(["Clique", "ArchipIDLE"], 42, profiler)
+        recorded = {(step["name"].split(".")[-1], step["player"]) for step in profiler.steps}
+        for step in gen_steps:
+            for player in (1, 2):
+                self.assertIn((step, player), recorded)
+        for step in profiler.steps:
+            self.assertGreaterEqual(step["seconds"], 0)
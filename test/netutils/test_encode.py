@@ -0,0 +1,66 @@
+# Tests for NetUtils.encode, which has to write exactly what the json based encoder always wrote
+
+import typing
+import unittest
+
+import NetUtils
+from NetUtils import Hint, NetworkItem, NetworkPlayer, NetworkSlot, SlotType, decode, encode
+from Utils import Version
+
+
+def json_encode(obj: typing.Any) -> str:
+    return NetUtils._encode(NetUtils._scan_for_TypedTuples(obj))
+
+
+class Unserializable:
+    pass
+
+
+class TestEncode(unittest.TestCase):
+    payloads: typing.Dict[str, typing.Any] = {
+        "received items": [{"cmd": "ReceivedItems", "index": 0,
+                            "items": [NetworkItem(item, item + 1, 2, 1) for item in range(100)]}],
+        "connected": [{"cmd": "Connected", "team": 0, "slot": 1,
+                       "players": [NetworkPlayer(0, 1, "Alias", "Name")],
+                       "missing_locations": list(range(10)), "checked_locations": set(range(10, 20)),
+                       "slot_info": {1: NetworkSlot("Name", "Game", SlotType.player),
+                                     2: NetworkSlot("Group", "Game", SlotType.group, [1, 3])},
+                       "slot_data": {"floats": [0.5, 1e20, -2.25], "nested": {"a": (1, 2), "b": None}}}],
+        "hints": [{"cmd": "PrintJSON", "data": [{"text": "ünïcödé   \x00 \"quoted\""}],
+                   "hint": Hint(1, 2, 3, 4, False, "entrance", 1)}],
+        "version": {"version": Version(0, 4, 4), "tags": frozenset({"AP"})},
+        "small float": {"data": 1e-05},
+        "nan": [float("nan"), float("inf"), -float("inf")],
+        "big int": {"value": 1 << 70},
+        "int keys": {1: "a", SlotType.group: "b", -5: "c"},
+        "other keys": {None: 1, True: 2, 1.5: 3},
+        "nested named tuple": NetworkItem(NetworkItem(1, 2, 3), (NetworkItem(4, 5, 6),), {"x": NetworkItem(7, 8, 9)}),
+        "named tuple float": NetworkItem(1e-10, 0.5, 3),
+        "lone surrogate": "\ud800",
+        "empty": [[], {}, (), set(), ""],
+    }
+
+    def test_matches_json(self) -> None:
+        for name, payload in self.payloads.items():
+            with self.subTest(name):
+                self.assertEqual(encode(payload), json_encode(payload))
+
+    def test_round_trip(self) -> None:
+        for name in ("received items", "hints", "version"):
+            with self.subTest(name):
+                self.assertEqual(encode(decode(encode(self.payloads[name]))), encode(self.payloads[name]))
+
+    def test_unserializable(self) -> None:
+        for payload in (Unserializable(), {"a": [Unserializable()]}, NetworkItem({1}, 2, 3)):
+            with self.subTest(payload=payload):
+                with self.assertRaises(TypeError):
+                    encode(payload)
+
+    @unittest.skipIf(NetUtils.orjson is None, "orjson not available")
+    def test_fast_path(self) -> None:
+        for name in ("received items", "connected", "hints", "version", "int keys", "empty"):
+            with self.subTest(name):
+                self.assertTrue(NetUtils._orjson_compatible((self.payloads[name],)))
+        for name in ("small float", "nan", "other keys", "nested named tuple", "named tuple float"):
+            with self.subTest(name):
+                self.assertFalse(NetUtils._orjson_compatible((self.payloads[name],)))
@@ -1,4 +1,9 @@
 # Tests for _speedups.LocationStore and NetUtils._LocationStore
+import gc
+import logging
+import random
+import time
+import tracemalloc
 import typing
 import unittest
 import warnings
@@ -189,6 +194,13 @@ class TestPurePythonLocationStore(Base.TestLocationStore):
         super().setUp()
 
 
+class TestPurePythonLocationStoreWithoutIndexes(Base.TestLocationStore):
+    """Run base method tests for pure python implementation without receiver indexes."""
+    def setUp(self) -> None:
+        self.store = _LocationStore(sample_data, build_indexes=False)
+        super().setUp()
+
+
 class TestPurePythonLocationStoreConstructor(Base.TestLocationStoreConstructor):
     """Run base constructor tests for the pure python implementation."""
     def setUp(self) -> None:
@@ -204,6 +216,14 @@ class TestSpeedupsLocationStore(Base.TestLocationStore):
         super().setUp()
 
 
+@unittest.skipIf(LocationStore is _LocationStore, "_speedups not available")
+class TestSpeedupsLocationStoreWithoutIndexes(Base.TestLocationStore):
+    """Run base method tests for cython implementation without receiver indexes."""
+    def setUp(self) -> None:
+        self.store = LocationStore(sample_data, build_indexes=False)
+        super().setUp()
+
+
 @unittest.skipIf(LocationStore is _LocationStore, "_speedups not available")
 class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
     """Run base constructor tests and tests the additional constraints for cython implementation."""
@@ -236,3 +256,84 @@ class TestSpeedupsLocationStoreConstructor(Base.TestLocationStoreConstructor):
             self.type({
                 1: {1: None},
             })
+
+
+def make_room(players: int, locations: int, items: int, seed: int) -> RawLocations:
+    """Random placements shaped like a real multidata, senders out of order to catch ordering differences."""
+    rng = random.Random(seed)
+    senders = list(range(1, players + 1))
+    rng.shuffle(senders)
+    return {sender: {location: (rng.randrange(items), rng.randrange(1, players + 1), rng.choice((0, 1, 2)))
+                     for location in rng.sample(range(1 << 20), locations)}
+            for sender in senders}
+
+
+class TestLocationStoreIndexes(unittest.TestCase):
+    """Compare stores with and without receiver indexes on a larger room."""
+    players = 200
+    locations = 250
+    items = 50
+    stores: typing.Dict[str, typing.Union[LocationStore, _LocationStore]]
+
+    def setUp(self) -> None:
+        self.data = make_room(self.players, self.locations, self.items, 42)
+        self.stores = {
+            "python": _LocationStore(self.data, build_indexes=False),
+            "python indexed": _LocationStore(self.data),
+        }
+        if LocationStore is not _LocationStore:
+            self.stores["speedups"] = LocationStore(self.data, build_indexes=False)
+            self.stores["speedups indexed"] = LocationStore(self.data)
+
+    def test_find_item_matches(self) -> None:
+        for slots in ({1}, {7, self.players}, set(range(1, 20))):
+            for item in (0, 13, self.items - 1, self.items):
+                expected = sorted(self.stores["python"].find_item(slots, item))
+                for name, store in self.stores.items():
+                    with self.subTest(store=name, slots=slots, item=item):
+                        found = list(store.find_item(slots, item))
+                        self.assertEqual(sorted(found), expected)
+                        # hints are handed out in location order of the store, indexed or not
+                        unindexed = name.replace(" indexed", "")
+                        self.assertEqual(found, list(self.stores[unindexed].find_item(slots, item)))
+
+    def test_get_for_player_matches(self) -> None:
+        for slot in (1, 50, self.players, self.players + 1):
+            expected = self.stores["python"].get_for_player(slot)
+            for name, store in self.stores.items():
+                with self.subTest(store=name, slot=slot):
+                    found = store.get_for_player(slot)
+                    self.assertEqual(found, expected)
+                    unindexed = name.replace(" indexed", "")
+                    self.assertEqual(list(found), list(self.stores[unindexed].get_for_player(slot)))
+
+    def test_report(self) -> None:
+        """Log memory and speed of the receiver indexes, run with --log-cli-level=INFO to see it."""
+        logger = logging.getLogger(__name__)
+        logger.info(f"{self.players} players, {self.players * self.locations} locations")
+        sizes: typing.Dict[str, int] = {}
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            for name, store in self.stores.items():
+                gc.collect()
+                before = tracemalloc.get_traced_memory()[0]
+                # the python store references the input dicts, so this only counts its own dict and indexes
+                copy = type(store)(self.data, build_indexes=name.endswith("indexed"))
+                sizes[name] = tracemalloc.get_traced_memory()[0] - before
+                del copy
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        for name, store in self.stores.items():
+            start = time.perf_counter()
+            for slot in range(1, self.players + 1):
+                list(store.find_item({slot}, slot % self.items))
+            hint_time = (time.perf_counter() - start) / self.players
+            start = time.perf_counter()
+            for slot in range(1, self.players + 1):
+                store.get_for_player(slot)
+            collect_time = (time.perf_counter() - start) / self.players
+            logger.info(f"{name:>16}: size {sizes[name] / 1024:.0f} KiB, find_item {hint_time * 1e6:.1f} us, "
+                        f"get_for_player {collect_time * 1e6:.1f} us")
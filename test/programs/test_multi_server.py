@@ -1,5 +1,15 @@
+import asyncio
+import logging
+import os
+import tempfile
+import time
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from unittest import mock
+
+from MultiServer import Client, Context, ServerCommandProcessor, process_client_cmd, register_location_checks, \
+    send_items_to, send_new_items
+from NetUtils import Hint, LocationStore, NetworkItem
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +48,347 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class FakeSocket:
+    """Collects what the server sends instead of writing to a websocket."""
+    open = True
+
+    def __init__(self) -> None:
+        self.sent: typing.List[str] = []
+
+    async def send(self, msg: str) -> None:
+        self.sent.append(msg)
+
+
+def fake_broadcast(sockets: typing.Iterable[FakeSocket], msg: str) -> None:
+    """Stands in for websockets.broadcast, which only accepts real connections."""
+    for socket in sockets:
+        socket.sent.append(msg)
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    """Load test of item sending in a room with many connected clients."""
+    players = 500
+
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.clients = {0: {}}
+        for slot in range(1, self.players + 1):
+            client = Client(FakeSocket(), self.ctx)
+            client.team, client.slot, client.auth = 0, slot, True
+            client.items_handling = 0b111
+            self.ctx.clients[0][slot] = [client]
+
+    def sockets(self) -> typing.Dict[int, FakeSocket]:
+        return {slot: clients[0].socket for slot, clients in self.ctx.clients[0].items()}
+
+    async def test_only_receivers_are_sent_items(self) -> None:
+        sockets = self.sockets()
+        start = time.perf_counter()
+        for location in range(1, self.players + 1):
+            receiver = location * 7 % self.players + 1
+            send_items_to(self.ctx, 0, receiver, NetworkItem(location, location, 1))
+            send_new_items(self.ctx)
+        await asyncio.sleep(0)  # let the send tasks run
+        taken = time.perf_counter() - start
+        logging.getLogger(__name__).info(f"{self.players} checks with {self.players} clients took {taken:.3f}s")
+
+        for slot, socket in sockets.items():
+            with self.subTest(slot=slot):
+                self.assertEqual(len(socket.sent), 1)
+                self.assertIn('"cmd":"ReceivedItems"', socket.sent[0])
+                self.assertIn('"index":0', socket.sent[0])
+                self.assertEqual(self.ctx.clients[0][slot][0].send_index, 1)
+        self.assertFalse(self.ctx.received_items_changed)
+
+        # nothing changed, so nothing is sent
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(sum(len(socket.sent) for socket in sockets.values()), self.players)
+
+    async def test_batched_items(self) -> None:
+        sockets = self.sockets()
+        send_items_to(self.ctx, 0, 3, NetworkItem(1, 1, 1), NetworkItem(2, 2, 1))
+        send_items_to(self.ctx, 0, 3, NetworkItem(3, 3, 2))
+        send_new_items(self.ctx)
+        send_items_to(self.ctx, 0, 3, NetworkItem(4, 4, 2))
+        send_new_items(self.ctx)
+        await asyncio.sleep(0)
+        self.assertEqual(len(sockets[3].sent), 2)
+        self.assertIn('"index":0', sockets[3].sent[0])
+        self.assertIn('"index":3', sockets[3].sent[1])
+        self.assertEqual(self.ctx.clients[0][3][0].send_index, 4)
+        self.assertFalse(any(socket.sent for slot, socket in sockets.items() if slot != 3))
+
+
+class TestBatchedBroadcast(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("websockets.broadcast", fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.clients = {0: {}, 1: {}}
+        for team in (0, 1):
+            for slot in (1, 2):
+                client = Client(FakeSocket(), self.ctx)
+                client.team, client.slot, client.auth = team, slot, True
+                self.ctx.clients[team][slot] = [client]
+
+    def sent(self, team: int) -> typing.List[typing.List[dict]]:
+        frames = [[self.ctx.loader(msg) for msg in clients[0].socket.sent]
+                  for clients in self.ctx.clients[team].values()]
+        self.assertTrue(all(client_frames == frames[0] for client_frames in frames))
+        return frames[0]
+
+    async def test_one_frame_per_team(self) -> None:
+        for i in range(3):
+            self.ctx.broadcast_team_batched(0, [{"cmd": "PrintJSON", "data": [{"text": str(i)}]}])
+        self.ctx.broadcast_team_batched(1, [{"cmd": "PrintJSON", "data": [{"text": "other team"}]}])
+        # sent after the batch was started, so it has to arrive after it
+        self.ctx.broadcast(self.ctx.clients[0][1] + self.ctx.clients[0][2], [{"cmd": "RoomUpdate"}])
+        await asyncio.sleep(0)
+        frames = self.sent(0)
+        self.assertEqual(len(frames), 2)
+        self.assertEqual([msg["data"][0]["text"] for msg in frames[0]], ["0", "1", "2"])
+        self.assertEqual(frames[1], [{"cmd": "RoomUpdate"}])
+        self.assertEqual(len(self.sent(1)), 1)
+        self.assertFalse(self.ctx.team_broadcast_queue)
+
+    async def test_large_batches_are_split(self) -> None:
+        count = self.ctx.team_broadcast_batch_size * 2 + 1
+        for i in range(count):
+            self.ctx.broadcast_team_batched(0, [{"cmd": "PrintJSON", "data": [{"text": str(i)}]}])
+        await asyncio.sleep(0)
+        frames = self.sent(0)
+        self.assertEqual([len(frame) for frame in frames], [self.ctx.team_broadcast_batch_size,
+                                                            self.ctx.team_broadcast_batch_size, 1])
+        self.assertEqual([msg["data"][0]["text"] for frame in frames for msg in frame],
+                         [str(i) for i in range(count)])
+
+
+class TestDataPackage(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.gamespackage = {
+            "Game \"One\"": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 1},
+                             "checksum": "0123456789abcdef"},
+            "Gäme Two": {"item_name_to_id": {"Sword": 2, "Shield": 3}, "location_name_to_id": {}},
+        }
+
+    def test_matches_encoded_package(self) -> None:
+        for games in ([], ["Gäme Two"], list(self.ctx.gamespackage)):
+            with self.subTest(games=games):
+                expected = self.ctx.dumper([{"cmd": "DataPackage", "data": {
+                    "games": {game: self.ctx.gamespackage[game] for game in games}}}])
+                self.assertEqual(self.ctx.encode_data_package(games), expected)
+
+    def test_packages_are_encoded_once(self) -> None:
+        for game in self.ctx.gamespackage:
+            with self.subTest(game=game):
+                self.assertIs(self.ctx.get_encoded_game_package(game), self.ctx.get_encoded_game_package(game))
+        other_ctx = Context("", 0, "", "", 0, 0, False)
+        other_ctx.gamespackage = self.ctx.gamespackage
+        # packages with a checksum are shared between rooms
+        self.assertIs(other_ctx.get_encoded_game_package("Game \"One\""),
+                      self.ctx.get_encoded_game_package("Game \"One\""))
+
+
+class TestSaveJournal(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        for patcher in (mock.patch.object(Context, "_start_async_saving"),
+                        mock.patch("websockets.broadcast", fake_broadcast)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.save_filename = os.path.join(directory.name, "test.apsave")
+        self.ctx = self.new_context()
+
+    def new_context(self) -> Context:
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.save_filename = self.save_filename
+        ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 1, 0)}, 2: {20: (200, 1, 0)}})
+        ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        ctx.clients = {0: {1: [], 2: []}}
+        ctx.init_save()
+        return ctx
+
+    def play(self) -> None:
+        hint = Hint(1, 2, 20, 200, False)
+        self.ctx.add_hint(0, 1, hint)
+        self.ctx.journal_save("hint", 0, 1, hint)
+        register_location_checks(self.ctx, 0, 1, [10, 11])
+        register_location_checks(self.ctx, 0, 2, [20])
+        self.ctx.stored_data["key"] = [1, 2]
+        self.ctx.journal_save("stored_data", "key", [1, 2])
+        self.ctx.hints_used[0, 1] += 1
+
+    def assertSameSave(self, ctx: Context) -> None:
+        self.assertEqual(ctx.received_items, self.ctx.received_items)
+        self.assertEqual(ctx.location_checks, self.ctx.location_checks)
+        self.assertEqual(ctx.hints, self.ctx.hints)
+        self.assertEqual(ctx.stored_data, self.ctx.stored_data)
+        self.assertEqual(ctx.hints_used, self.ctx.hints_used)
+
+    async def test_replay(self) -> None:
+        self.ctx.stored_data["large"] = list(range(10000))
+        self.assertTrue(self.ctx._save())  # first save is a snapshot
+        snapshot = os.path.getsize(self.save_filename)
+        self.play()
+        self.assertTrue(self.ctx._save())
+        self.assertEqual(os.path.getsize(self.save_filename), snapshot)
+        self.assertGreater(os.path.getsize(self.ctx.save_journal_filename), 0)
+
+        ctx = self.new_context()
+        self.assertSameSave(ctx)
+        self.assertEqual(len(ctx.received_items[0, 1, True]), 2)
+        # the hint was journaled before location 20 was checked
+        self.assertEqual(ctx.hints[0, 1], {Hint(1, 2, 20, 200, True)})
+
+    async def test_replay_is_idempotent(self) -> None:
+        self.assertTrue(self.ctx._save())
+        self.play()
+        journal = list(self.ctx.save_journal)
+        self.assertTrue(self.ctx._save(True))  # exit saves are snapshots containing the journal
+        with open(self.ctx.save_journal_filename, "wb") as f:
+            f.write(b"".join(journal) + journal[0][:5])  # torn record at the end
+        self.assertSameSave(self.new_context())
+
+        # records written after loading a torn journal are not lost
+        self.ctx = self.new_context()
+        self.ctx.stored_data["after"] = True
+        self.ctx.journal_save("stored_data", "after", True)
+        self.assertTrue(self.ctx._save())
+        self.assertSameSave(self.new_context())
+
+    async def test_stale_journal(self) -> None:
+        self.ctx.stored_data["large"] = list(range(10000))
+        self.assertTrue(self.ctx._save())
+        self.play()
+        self.assertTrue(self.ctx._save())
+        self.assertGreater(self.ctx.save_journal_size, 0)
+        with open(self.ctx.save_journal_filename, "rb") as f:
+            stale_journal = f.read()
+        self.ctx.stored_data["key"] = [3]
+        self.ctx.hints_used[0, 1] += 1
+        self.assertTrue(self.ctx._save(True))
+        # the server stopped after writing the snapshot, before starting its journal
+        with open(self.ctx.save_journal_filename, "wb") as f:
+            f.write(stale_journal)
+        self.assertSameSave(self.new_context())
+
+        # records written after skipping a stale journal are not lost
+        self.ctx = self.new_context()
+        self.ctx.stored_data["after"] = True
+        self.ctx.journal_save("stored_data", "after", True)
+        self.assertTrue(self.ctx._save())
+        self.assertSameSave(self.new_context())
+
+    async def test_compaction(self) -> None:
+        self.assertTrue(self.ctx._save())
+        for i in range(100):
+            self.ctx.stored_data[i] = i
+            self.ctx.journal_save("stored_data", i, i)
+            self.assertTrue(self.ctx._save())
+            self.assertLessEqual(self.ctx.save_journal_size, self.ctx.save_snapshot_size)
+            self.assertEqual(os.path.getsize(self.ctx.save_journal_filename), self.ctx.save_journal_size)
+        self.assertSameSave(self.new_context())
+
+
+class TestHints(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("websockets.broadcast", fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.locations = LocationStore({1: {10: (100, 2, 0), 11: (101, 2, 0)}, 2: {20: (200, 1, 0)}})
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.ctx.clients = {0: {1: [], 2: []}}
+
+    async def test_checks_mark_hints_found(self) -> None:
+        hints = [Hint(2, 1, 10, 100, False), Hint(2, 1, 11, 101, False)]
+        self.ctx.notify_hints(0, hints)
+        for slot in (1, 2):
+            self.assertEqual(self.ctx.hints[0, slot], set(hints))
+
+        register_location_checks(self.ctx, 0, 1, [10])
+        expected = {Hint(2, 1, 10, 100, True), Hint(2, 1, 11, 101, False)}
+        for slot in (1, 2):
+            with self.subTest(slot=slot):
+                self.assertEqual(self.ctx.hints[0, slot], expected)
+                self.assertEqual(self.ctx.get_rechecked_hints(0, slot), expected)
+        self.assertEqual(list(self.ctx.unfound_hints), [(0, 1, 11)])
+
+        # hints for checked locations are remembered as found right away
+        self.ctx.add_hint(0, 2, Hint(1, 2, 20, 200, False))
+        register_location_checks(self.ctx, 0, 2, [20])
+        self.ctx.add_hint(0, 1, Hint(1, 2, 20, 200, False))
+        self.assertIn(Hint(1, 2, 20, 200, True), self.ctx.hints[0, 1])
+        self.assertIn(Hint(1, 2, 20, 200, True), self.ctx.hints[0, 2])
+        self.assertEqual(list(self.ctx.unfound_hints), [(0, 1, 11)])
+
+    def test_recheck_rebuilds_index(self) -> None:
+        self.ctx.hints[0, 1] = {Hint(2, 1, 10, 100, False), Hint(2, 1, 11, 101, False)}
+        self.ctx.location_checks[0, 1] = {10}
+        self.ctx.recheck_hints()
+        self.assertEqual(self.ctx.hints[0, 1], {Hint(2, 1, 10, 100, True), Hint(2, 1, 11, 101, False)})
+        self.assertEqual(dict(self.ctx.unfound_hints), {(0, 1, 11): [(1, Hint(2, 1, 11, 101, False))]})
+
+
+class TestBounce(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        patcher = mock.patch("websockets.broadcast", fake_broadcast)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ctx = Context("", 0, "", "", 0, 0, False)
+        self.ctx.games = {1: "A", 2: "A", 3: "B"}
+        self.ctx.player_names = {(team, slot): f"Player{slot}" for team in (0, 1) for slot in self.ctx.games}
+        self.ctx.clients = {0: {slot: [] for slot in self.ctx.games}, 1: {slot: [] for slot in self.ctx.games}}
+        self.tagged = self.connect(0, 1, ["DeathLink"])
+        self.untagged = self.connect(0, 2, [])
+        self.other_game = self.connect(0, 3, [])
+        self.other_team = self.connect(1, 1, ["DeathLink"])
+
+    def connect(self, team: int, slot: int, tags: typing.List[str]) -> Client:
+        client = Client(FakeSocket(), self.ctx)
+        client.team, client.slot, client.tags, client.auth = team, slot, tags, True
+        self.ctx.endpoints.append(client)
+        self.ctx.clients[team][slot].append(client)
+        self.ctx.index_client(client)
+        return client
+
+    def bounced(self) -> typing.Set[Client]:
+        bounced = {client for client in self.ctx.endpoints if client.socket.sent}
+        for client in bounced:
+            self.assertEqual(len(client.socket.sent), 1)
+            self.assertEqual(self.ctx.loader(client.socket.sent[0])[0]["cmd"], "Bounced")
+            client.socket.sent.clear()
+        return bounced
+
+    async def bounce(self, sender: Client, **targets: list) -> None:
+        await process_client_cmd(self.ctx, sender, {"cmd": "Bounce", "data": {}, **targets})
+
+    async def test_targets(self) -> None:
+        await self.bounce(self.other_game, tags=["DeathLink"])
+        self.assertEqual(self.bounced(), {self.tagged})
+        await self.bounce(self.other_game, games=["A"])
+        self.assertEqual(self.bounced(), {self.tagged, self.untagged})
+        await self.bounce(self.tagged, slots=[3], tags=["DeathLink"])
+        self.assertEqual(self.bounced(), {self.tagged, self.other_game})
+        await self.bounce(self.tagged, games=["C"], tags=["Tracker"], slots=[4])
+        self.assertEqual(self.bounced(), set())
+
+    async def test_index_follows_clients(self) -> None:
+        await process_client_cmd(self.ctx, self.untagged, {"cmd": "ConnectUpdate", "tags": ["DeathLink"]})
+        await process_client_cmd(self.ctx, self.tagged, {"cmd": "ConnectUpdate", "tags": []})
+        await asyncio.sleep(0)  # let the TagsChanged notices go out
+        for client in self.ctx.endpoints:
+            client.socket.sent.clear()
+        await self.bounce(self.other_game, tags=["DeathLink"])
+        self.assertEqual(self.bounced(), {self.untagged})
+
+        await self.ctx.disconnect(self.untagged)
+        await self.bounce(self.other_game, tags=["DeathLink"], games=["A"])
+        self.assertEqual(self.bounced(), {self.tagged})
+        self.assertNotIn((0, "DeathLink"), self.ctx.clients_by_tag)
@@ -0,0 +1,39 @@
+# Tests for the .archipelago format helpers in Utils.py
+
+import io
+import pickle
+import unittest
+import zlib
+
+from NetUtils import NetworkSlot, SlotType
+from Utils import VersionException, dump_multidata, load_multidata, multidata_format_version
+
+
+class TestMultidataFormat(unittest.TestCase):
+    multidata = {
+        "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player)},
+        "locations": {1: {location: (location + 1, 1, 0) for location in range(10000)}},
+        "seed_name": "12345",
+    }
+
+    def test_round_trip(self) -> None:
+        for level in (1, 6, 9):
+            with self.subTest(level=level):
+                file = io.BytesIO()
+                dump_multidata(self.multidata, file, level)
+                data = file.getvalue()
+                self.assertEqual(data[0], multidata_format_version)
+                self.assertEqual(load_multidata(data), self.multidata)
+
+    def test_reads_format_3(self) -> None:
+        data = bytes([3]) + zlib.compress(pickle.dumps(self.multidata), 9)
+        self.assertEqual(load_multidata(data), self.multidata)
+
+    def test_rejects_unknown(self) -> None:
+        file = io.BytesIO()
+        dump_multidata(self.multidata, file)
+        data = file.getvalue()
+        with self.assertRaises(VersionException):
+            load_multidata(bytes([multidata_format_version + 1]) + data[1:])
+        with self.assertRaises(VersionException):
+            load_multidata(data[:1] + bytes([255]) + data[2:])
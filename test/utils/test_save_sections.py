@@ -0,0 +1,34 @@
+# Tests for the sectioned save format helpers in Utils.py
+
+import pickle
+import unittest
+
+from NetUtils import NetworkItem
+from Utils import SaveSections, dump_save_sections
+
+
+class TestSaveSections(unittest.TestCase):
+    save = {
+        "location_checks": {(0, 1): {1, 2, 3}},
+        "received_items": {(0, 1, True): [NetworkItem(1, 2, 1, 0)]},
+        "stored_data": {"key": list(range(1000))},
+        "version": 3,
+    }
+
+    def test_round_trip(self) -> None:
+        sections = SaveSections(dump_save_sections({key: pickle.dumps(value) for key, value in self.save.items()}))
+        self.assertEqual(list(sections), list(self.save))
+        self.assertEqual(dict(sections), self.save)
+        self.assertEqual(sections.get("hints", {}), {})
+
+    def test_lazy_sections(self) -> None:
+        sections = SaveSections(dump_save_sections({key: pickle.dumps(value) for key, value in self.save.items()}))
+        self.assertEqual(sections["location_checks"], self.save["location_checks"])
+        self.assertNotIn("stored_data", sections._loaded)
+        self.assertEqual(sections.get_section_data("stored_data"), pickle.dumps(self.save["stored_data"]))
+
+    def test_reads_plain_pickle(self) -> None:
+        sections = SaveSections(pickle.dumps(self.save))
+        self.assertEqual(dict(sections), self.save)
+        self.assertIsNone(sections.get_section_data("version"))
+        self.assertEqual(dict(SaveSections(b"")), {})
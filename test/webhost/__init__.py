@@ -0,0 +1,28 @@
+import typing
+import unittest
+
+if typing.TYPE_CHECKING:
+    from flask import Flask
+    from flask.testing import FlaskClient
+
+
+class TestBase(unittest.TestCase):
+    """Base for tests against the WebHost app, which is set up once, with an in-memory database, for all of them."""
+    app: typing.ClassVar[typing.Optional["Flask"]] = None
+    client: typing.ClassVar["FlaskClient"]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        if TestBase.app is None:
+            from WebHostLib import app as raw_app
+            from WebHost import get_app
+            raw_app.config["PONY"] = {
+                "provider": "sqlite",
+                "filename": ":memory:",
+                "create_db": True,
+            }
+            raw_app.config.update({
+                "TESTING": True,
+            })
+            TestBase.app = get_app()
+        cls.client = TestBase.app.test_client()
@@ -0,0 +1,42 @@
+import os
+import tempfile
+import types
+import unittest
+import uuid
+from unittest import mock
+
+from WebHostLib.customserver import DBCommandListener, get_command_notification_file, notify_room_command
+from WebHostLib.locker import CommonLocker
+
+
+class TestCommandNotification(unittest.TestCase):
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for patcher in (mock.patch.object(CommonLocker, "lock_folder", directory.name),
+                        mock.patch.object(DBCommandListener, "notified_interval", 0.2),
+                        mock.patch.object(DBCommandListener, "run")):  # no polling thread without a database
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.listener = DBCommandListener()
+        self.addCleanup(self.listener.notification_socket.close)
+        self.rooms = [types.SimpleNamespace(room_id=uuid.uuid4()) for _ in range(2)]
+        for ctx in self.rooms:
+            self.listener.add(ctx)
+
+    def test_notified_rooms(self) -> None:
+        notify_room_command(self.rooms[0].room_id)
+        self.assertEqual(self.listener.wait(), {str(self.rooms[0].room_id)})
+        for ctx in self.rooms:
+            notify_room_command(ctx.room_id)
+        self.assertEqual(self.listener.wait(), {str(ctx.room_id) for ctx in self.rooms})
+
+    def test_fallback_poll(self) -> None:
+        self.assertIsNone(self.listener.wait())
+
+    def test_removed_room(self) -> None:
+        self.listener.remove(self.rooms[0])
+        self.assertFalse(os.path.exists(get_command_notification_file(self.rooms[0].room_id)))
+        notify_room_command(self.rooms[0].room_id)
+        notify_room_command(uuid.uuid4())
+        self.assertIsNone(self.listener.wait())
@@ -0,0 +1,91 @@
+import unittest
+import uuid
+
+
+class TestGenerationQueue(unittest.TestCase):
+    def test_priority(self) -> None:
+        from WebHostLib.autolauncher import GenerationQueue
+
+        queue = GenerationQueue(slots=2, max_wait=600)
+        owner, other_owner = uuid.uuid4(), uuid.uuid4()
+        big, small, other = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+        queue.add(big, owner, 50)
+        queue.add(small, owner, 2)
+        queue.add(other, other_owner, 30)
+
+        # smaller generations go first, then owners that have nothing running yet
+        self.assertEqual(queue.take(), small)
+        self.assertEqual(queue.take(), other)
+        self.assertIsNone(queue.take(), "all slots are taken")
+        queue.finish(small)
+        self.assertEqual(queue.take(), big)
+        self.assertIn(big, queue)
+        queue.finish(big)
+        self.assertNotIn(big, queue)
+
+    def test_fairness(self) -> None:
+        from WebHostLib.autolauncher import GenerationQueue
+
+        queue = GenerationQueue(slots=3, max_wait=600)
+        owner, other_owner = uuid.uuid4(), uuid.uuid4()
+        first, second = uuid.uuid4(), uuid.uuid4()
+        queue.add(first, owner, 1)
+        queue.add(second, owner, 1)
+        queue.add(uuid.uuid4(), other_owner, 20)
+        self.assertEqual(queue.take(), first)
+        self.assertNotEqual(queue.take(), second, "owner already has a generation running")
+
+    def test_overdue(self) -> None:
+        from WebHostLib.autolauncher import GenerationQueue
+
+        queue = GenerationQueue(slots=1, max_wait=0)
+        owner = uuid.uuid4()
+        big, small = uuid.uuid4(), uuid.uuid4()
+        queue.add(big, owner, 50)
+        queue.add(small, owner, 2)
+        queue.retain([big, small])
+        self.assertEqual(queue.take(), big)
+        queue.retain([])
+        self.assertEqual(queue.queued, {})
+
+
+class TestGenerationProgress(unittest.TestCase):
+    def test_cancel(self) -> None:
+        import contextvars
+        from test.general.test_stages import setup_multiworld
+        from Utils import generation_progress_hook
+        from WebHostLib.generate import GenerationCancelled, GenerationProgress
+
+        progress = GenerationProgress(None)
+        reports = []
+
+        def report(step: str, done: int, total: int) -> None:
+            reports.append((step, done, total))
+            progress.cancel()
+            progress.step_progress(step, done, total)
+
+        def generate() -> None:
+            generation_progress_hook.set(report)
+            setup_multiworld(["Clique", "Clique"], 1)
+
+        with self.assertRaises(GenerationCancelled):
+            contextvars.copy_context().run(generate)
+        # world stages report after every world, so the generation stops right after the first one
+        self.assertEqual(reports, [("generate_early", 1, 2)])
+        self.assertIsNone(generation_progress_hook.get())
+
+    def test_slot_freed_after_failure(self) -> None:
+        from multiprocessing.pool import ThreadPool
+        from WebHostLib.autolauncher import GenerationQueue, wait_for_generator
+
+        queue = GenerationQueue(slots=1, max_wait=600)
+        generation_id = uuid.uuid4()
+        queue.add(generation_id, uuid.uuid4(), 1)
+        self.assertEqual(queue.take(), generation_id)
+
+        def generate() -> None:
+            raise ValueError("Generation failed.")
+
+        with ThreadPool(1) as pool, self.assertLogs(level="ERROR"):
+            wait_for_generator(pool.apply_async(generate), lambda: queue.finish(generation_id))
+        self.assertNotIn(generation_id, queue)
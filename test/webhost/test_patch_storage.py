@@ -0,0 +1,69 @@
+import io
+import json
+import pickle
+import uuid
+import zipfile
+
+from . import TestBase
+
+
+def make_container(player: int) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("archipelago.json", json.dumps({"player": player, "patch_file_ending": ".aptest"}))
+        zf.writestr("patch/data.bin", bytes(range(256)) * 64)
+        zf.writestr("patch/stored.txt", "stored as is", zipfile.ZIP_STORED)
+    return buffer.getvalue()
+
+
+class TestPatchStorage(TestBase):
+    def test_payload_deduplicated(self) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Slot
+        from WebHostLib.patches import PatchRecord, get_patch, get_patch_manifest, is_split_patch, \
+            patch_record_magic, store_patch
+
+        with db_session:
+            first, second = store_patch(make_container(1)), store_patch(make_container(2))
+            self.assertTrue(is_split_patch(first))
+            # only the manifests differ, so both slots share their payload
+            records = [PatchRecord(*pickle.loads(data[len(patch_record_magic):])) for data in (first, second)]
+            self.assertEqual(records[0].payload, records[1].payload)
+            self.assertEqual([record.manifest["player"] for record in records], [1, 2])
+
+            slot = Slot(data=second, player_id=2, player_name="Player2", game="Test")
+            self.assertEqual(get_patch_manifest(slot)["player"], 2)
+            with zipfile.ZipFile(io.BytesIO(get_patch(slot))) as zf:
+                self.assertIsNone(zf.testzip())
+                self.assertEqual(zf.read("patch/data.bin"), bytes(range(256)) * 64)
+
+        # data that is not a container is stored unchanged
+        with db_session:
+            self.assertEqual(store_patch(b"old patch"), b"old patch")
+            self.assertIsNone(store_patch(None))
+
+    def test_download_patch(self) -> None:
+        from pony.orm import commit, db_session
+        from WebHostLib.models import Room, Seed, Slot
+        from WebHostLib.patches import store_patch
+
+        with db_session:
+            data = store_patch(make_container(1))
+            owner = uuid.uuid4()
+            slot = Slot(data=data, player_id=1, player_name="Player1", game="Test")
+            room = Room(seed=Seed(multidata=b"", owner=owner, slots={slot}), owner=owner, last_port=38281)
+            commit()
+            suuid = self.app.jinja_env.filters["suuid"]
+            url = f"/dl_patch/{suuid(room.id)}/{slot.id}"
+            fname = f"P1_Player1_{suuid(room.id)}.aptest"
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(fname, response.headers["Content-Disposition"])
+        self.assertEqual(int(response.headers["Content-Length"]), len(response.data))
+        with zipfile.ZipFile(io.BytesIO(response.data)) as zf:
+            self.assertIsNone(zf.testzip())
+            manifest = json.loads(zf.read("archipelago.json"))
+            self.assertEqual(manifest["server"], f"{self.app.config['HOST_ADDRESS']}:38281")
+            self.assertEqual(zf.read("patch/data.bin"), bytes(range(256)) * 64)
+            self.assertEqual(zf.read("patch/stored.txt"), b"stored as is")
@@ -0,0 +1,60 @@
+import unittest
+
+from Utils import SaveSections
+
+
+class TestRoomSave(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        from WebHostLib.customserver import WebHostContext, get_static_server_data
+
+        self.ctx = WebHostContext(get_static_server_data())
+
+    async def test_changed_sections(self) -> None:
+        self.ctx.stored_data = {"key": 1}
+        self.ctx.name_aliases[0, 1] = "Alias"
+        self.assertEqual(SaveSections(self.ctx.dump_save())["stored_data"], {"key": 1})
+
+        # sections that are journaled are reused until the journal reports a change to them
+        self.ctx.stored_data["key"] = 2
+        self.ctx.name_aliases[0, 1] = "Other Alias"
+        save = SaveSections(self.ctx.dump_save())
+        self.assertEqual(save["stored_data"], {"key": 1})
+        self.assertEqual(save["name_aliases"], {(0, 1): "Other Alias"})
+        self.ctx.journal_save("stored_data", "key", 2)
+        self.assertEqual(SaveSections(self.ctx.dump_save())["stored_data"], {"key": 2})
+
+        self.ctx.stored_data["key"] = 3
+        self.assertEqual(SaveSections(self.ctx.dump_save(full=True))["stored_data"], {"key": 3})
+
+    async def test_section_marked_during_save(self) -> None:
+        self.ctx.stored_data = {"key": 1}
+        self.ctx.dump_save()
+        # journal_save on the event loop may have looked up the set right before the autosave thread went through it
+        dirty_sections = self.ctx.dirty_save_sections
+        self.ctx.dump_save()
+        self.ctx.stored_data["key"] = 2
+        dirty_sections.update(self.ctx.journaled_save_sections["stored_data"])
+        self.assertEqual(SaveSections(self.ctx.dump_save())["stored_data"], {"key": 2})
+
+
+class TestHostRoom(unittest.IsolatedAsyncioTestCase):
+    async def test_load_off_event_loop(self) -> None:
+        """Loading a room should not stop the other rooms hosted on the same event loop."""
+        import asyncio
+        import threading
+        from unittest import mock
+        from WebHostLib.customserver import WebHostContext, get_static_server_data, host_room
+
+        loop_ran = threading.Event()
+
+        def load(ctx: WebHostContext, room_id: int) -> None:
+            if not loop_ran.wait(5):
+                raise TimeoutError("The event loop was blocked while loading.")
+            raise KeyError(room_id)  # stop before the room is hosted
+
+        with mock.patch.object(WebHostContext, "load", load):
+            hosting = asyncio.create_task(host_room(1, get_static_server_data(), None, "", mock.Mock()))
+            await asyncio.sleep(0.1)
+            loop_ran.set()
+            with self.assertRaises(KeyError):
+                await hosting
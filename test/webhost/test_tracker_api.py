@@ -0,0 +1,84 @@
+import io
+import pickle
+import uuid
+
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from Utils import dump_multidata, dump_save_sections
+from . import TestBase
+
+
+class TestTrackerAPI(TestBase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        from pony.orm import db_session
+        from WebHostLib.models import GameDataPackage, Room, Seed
+
+        multidata = {
+            "seed_name": "TrackerAPITest",
+            "slot_info": {1: NetworkSlot("Player1", "Clique", SlotType.player),
+                          2: NetworkSlot("Player2", "Clique", SlotType.player)},
+            "locations": {1: {1: (2, 2, 0), 2: (1, 1, 0)}, 2: {1: (1, 1, 0), 2: (2, 2, 0)}},
+            "datapackage": {"Clique": {"checksum": "TrackerAPITest"}},
+        }
+        buffer = io.BytesIO()
+        dump_multidata(multidata, buffer)
+        with db_session:
+            GameDataPackage(checksum="TrackerAPITest", data=pickle.dumps({
+                "item_name_to_id": {"Item 1": 1, "Item 2": 2},
+                "location_name_to_id": {"Location 1": 1, "Location 2": 2},
+            }))
+            owner = uuid.uuid4()
+            room = Room(seed=Seed(multidata=buffer.getvalue(), owner=owner), owner=owner, tracker=uuid.uuid4(),
+                        multisave=pickle.dumps({"location_checks": {(0, 1): {1}}}))
+            cls.room_id = room.id
+            cls.url = f"/api/tracker/{cls.app.jinja_env.filters['suuid'](room.tracker)}"
+
+    def save(self, multisave: dict) -> None:
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+
+        with db_session:
+            Room[self.room_id].multisave = dump_save_sections({key: pickle.dumps(value)
+                                                               for key, value in multisave.items()})
+
+    def test_tracker_changes(self) -> None:
+        self.save({"location_checks": {(0, 1): {1}}})
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(response.get_etag()[0], data["version"])
+        self.assertEqual(data["seed_name"], "TrackerAPITest")
+        self.assertEqual([(player["player"], player["checked_locations"], player["total_locations"])
+                          for player in data["players"]], [(1, [1], 2), (2, [], 2)])
+
+        # nothing saved since
+        self.assertEqual(self.client.get(self.url, headers={"If-None-Match": f'"{data["version"]}"'}).status_code, 304)
+        self.assertEqual(self.client.get(self.url, query_string={"since": data["version"]}).status_code, 304)
+
+        hint = Hint(1, 2, 2, 2, False)
+        self.save({"location_checks": {(0, 1): {1}, (0, 2): {1}},
+                   "received_items": {(0, 2, True): [NetworkItem(2, 1, 1, 0)], (0, 1, True): [NetworkItem(1, 1, 2, 0)]},
+                   "hints": {(0, 1): {hint}, (0, 2): {hint}}})
+        self.client.get(self.url)
+        self.save({"location_checks": {(0, 1): {1, 2}, (0, 2): {1}},
+                   "received_items": {(0, 2, True): [NetworkItem(2, 1, 1, 0)],
+                                      (0, 1, True): [NetworkItem(1, 1, 2, 0), NetworkItem(1, 2, 1, 0)]},
+                   "hints": {(0, 1): {hint}, (0, 2): {hint}},
+                   "client_game_state": {(0, 1): ClientStatus.CLIENT_GOAL}})
+        response = self.client.get(self.url, query_string={"since": data["version"]})
+        self.assertEqual(response.status_code, 200)
+        changes = response.get_json()
+        self.assertEqual(changes["since"], data["version"])
+        self.assertEqual(changes["version"], response.get_etag()[0])
+        self.assertEqual(changes["players"], [
+            {"team": 0, "player": 1, "status": ClientStatus.CLIENT_GOAL, "checked_locations": [2],
+             "received_items": [[1, 1, 2, 0], [1, 2, 1, 0]]},
+            {"team": 0, "player": 2, "checked_locations": [1], "received_items": [[2, 1, 1, 0]]},
+        ])
+        self.assertEqual(changes["hints"], [{"team": 0, **hint._asdict()}])
+
+        # unknown versions fall back to the full tracker data
+        data = self.client.get(self.url, query_string={"since": "unknown"}).get_json()
+        self.assertEqual(data["seed_name"], "TrackerAPITest")
+        self.assertEqual(data["players"][0]["status"], ClientStatus.CLIENT_GOAL)
@@ -12,6 +12,7 @@ from typing import Any, Callable, ClassVar, Dict, Set, Tuple, FrozenSet, List, O
 
 from Options import PerGameCommonOptions
 from BaseClasses import CollectionState
+from Utils import profile_step, report_generation_progress
 
 if TYPE_CHECKING:
     import random
@@ -119,9 +120,10 @@ class AutoLogicRegister(type):
 
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
-    start = time.perf_counter()
-    ret = method(*args)
-    taken = time.perf_counter() - start
+    with profile_step(multiworld.profiler if multiworld else None, "world", method.__qualname__, player):
+        start = time.perf_counter()
+        ret = method(*args)
+        taken = time.perf_counter() - start
     if taken > 1.0:
         if player and multiworld:
             perf_logger.info(f"Took {taken:.4f} seconds in {method.__qualname__} for player {player}, "
@@ -148,10 +150,11 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
-    for player in multiworld.player_ids:
+    for done, player in enumerate(multiworld.player_ids, start=1):
         prev_item_count = len(multiworld.itempool)
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
+        report_generation_progress(method_name, done, multiworld.players)
         if __debug__:
             new_items = multiworld.itempool[prev_item_count:]
             for i, item in enumerate(new_items):
@@ -168,7 +171,8 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     for world_type in sorted(world_types, key=lambda world: world.__name__):
         stage_callable = getattr(world_type, f"stage_{method_name}", None)
         if stage_callable:
-            _timed_call(stage_callable, multiworld, *args)
+            _timed_call(stage_callable, multiworld, *args, multiworld=multiworld)
+            report_generation_progress(f"stage_{method_name}", 1, 1)
 
 
 class WebWorld: